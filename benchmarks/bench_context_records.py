@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: pydantic context models vs compact slotted records
+Compares cache decode/encode time and per-message memory at 10/100/1000 messages
+
+Usage: python benchmarks/bench_context_records.py
+"""
+
+import os
+import sys
+import json
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.context_manager import ConversationContext
+from core.records import ContextRecord, encode_context, decode_context
+
+SIZES = [10, 100, 1000]
+
+
+def build_payload(message_count: int) -> str:
+    """A cached context as ContextManager writes it"""
+    start = datetime(2026, 1, 1)
+    messages = [
+        {
+            "id": str(uuid4()),
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Message {i}: " + "lorem ipsum dolor sit amet " * 8,
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "metadata": {"ai_name": "gemini", "method": "tools/call"}
+        }
+        for i in range(message_count)
+    ]
+    return json.dumps({
+        "session_id": str(uuid4()),
+        "user_id": None,
+        "messages": messages,
+        "metadata": {},
+        "created_at": start.isoformat(),
+        "updated_at": start.isoformat(),
+        "project_context": None,
+        "summary": None
+    })
+
+
+def time_per_call(fn, repeat: int = 5) -> float:
+    """Best-of-repeat seconds per call"""
+    number, _ = timeit.Timer(fn).autorange()
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def bytes_per_message(build, message_count: int) -> float:
+    """Traced allocation of a decoded context, per message"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    obj = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del obj
+    return size / message_count
+
+
+def main():
+    print(f"{'messages':>8} | {'impl':<8} | {'decode us':>10} | {'encode us':>10} | {'bytes/msg':>10}")
+    print("-" * 60)
+
+    for size in SIZES:
+        payload = build_payload(size)
+        model = ConversationContext(**json.loads(payload))
+        record = decode_context(payload)
+
+        results = {
+            "pydantic": (
+                time_per_call(lambda: ConversationContext(**json.loads(payload))),
+                time_per_call(lambda: json.dumps(model.model_dump(), default=str)),
+                bytes_per_message(lambda: ConversationContext(**json.loads(payload)), size)
+            ),
+            "records": (
+                time_per_call(lambda: decode_context(payload)),
+                time_per_call(lambda: encode_context(record)),
+                bytes_per_message(lambda: decode_context(payload), size)
+            )
+        }
+
+        for impl, (decode_s, encode_s, per_message) in results.items():
+            print(
+                f"{size:>8} | {impl:<8} | {decode_s * 1e6:>10.1f} | "
+                f"{encode_s * 1e6:>10.1f} | {per_message:>10.0f}"
+            )
+
+        # Sanity check: both representations round-trip to the same data
+        assert ContextRecord.from_model(model).to_dict()["messages"] == record.to_dict()["messages"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: messages per second of the local context stores per durability level
+Many sessions add messages concurrently to SimpleContextManager, once for
+each backend (sqlite, files) and level (none, batched, strict), in a
+scratch directory
+
+Usage: python benchmarks/bench_local_durability.py [sessions] [messages per session]
+Set CONTEXT_GROUP_COMMIT_MS to try other batch intervals
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Measure the stores only, not background summaries
+os.environ["CONTEXT_COMPACTION_THRESHOLD"] = "1000000"
+
+from core.context_manager_simple import SimpleContextManager
+from core.durability import LEVELS, group_commit_interval
+
+BACKENDS = ["sqlite", "files"]
+
+
+async def run(backend: str, level: str, sessions: int, messages: int):
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = home
+        os.environ["CONTEXT_BACKEND"] = backend
+        os.environ["CONTEXT_DURABILITY"] = level
+        manager = SimpleContextManager()
+
+        async def session(n: int):
+            for i in range(messages):
+                await manager.add_message("bench", f"ai{n}", "user", f"message {i} " + "x" * 200)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session(n) for n in range(sessions)))
+        elapsed = time.perf_counter() - start
+
+        if manager.db:
+            stats = manager.db.stats()
+            commits = stats["batches"]
+            manager.db.close()
+        else:
+            commits = manager.group_sync.batches if level == "batched" else None
+
+    return sessions * messages / elapsed, commits
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print(f"{sessions} sessions x {messages} messages, group commit {group_commit_interval() * 1000:g}ms")
+    print(f"{'backend':<8} | {'durability':<10} | {'msgs/s':>10} | {'commits':>8}")
+    print("-" * 45)
+    for backend in BACKENDS:
+        for level in LEVELS:
+            rate, commits = asyncio.run(run(backend, level, sessions, messages))
+            commits = "-" if commits is None else commits
+            print(f"{backend:<8} | {level:<10} | {rate:>10.0f} | {commits:>8}")
+
+
+if __name__ == "__main__":
+    main()
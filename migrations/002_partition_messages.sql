@@ -0,0 +1,186 @@
+-- Monthly range partitioning for message storage
+--
+-- Converts the message tables to native range partitions on their timestamp
+-- column so that retention can detach or drop whole months instead of running
+-- cascading row-by-row deletes.
+--
+-- Handles both layouts found in the wild:
+--   * messages  - created by ContextManager (src/core/context_manager.py)
+--   * contexts  - created by 001_initial_schema.sql
+--
+-- Safe to re-run: tables that are already partitioned are left untouched.
+--
+-- Later months are provisioned, and expired ones detached or dropped, for both
+-- tables by ContextManager at startup and in its periodic retention job
+-- (MESSAGE_PARTITIONS_AHEAD, MESSAGE_RETENTION_MODE). Without the service, call
+-- ensure_monthly_partitions() / drop_monthly_partitions_before() from cron.
+
+-- Create (if missing) the partition of a parent table covering one month
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent regclass, month_start date)
+RETURNS text AS $$
+DECLARE
+    partition_name text := format('%s_p%s', parent::text, to_char(month_start, 'YYYY_MM'));
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+        partition_name,
+        parent,
+        date_trunc('month', month_start)::date,
+        (date_trunc('month', month_start) + interval '1 month')::date
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create partitions for the current month and the next `months_ahead` months
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent regclass, months_ahead integer DEFAULT 2)
+RETURNS void AS $$
+DECLARE
+    i integer;
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        PERFORM create_monthly_partition(
+            parent,
+            (date_trunc('month', CURRENT_TIMESTAMP) + make_interval(months => i))::date
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Detach (and optionally drop) every partition that ends on or before `cutoff`
+CREATE OR REPLACE FUNCTION drop_monthly_partitions_before(
+    parent regclass,
+    cutoff date,
+    detach_only boolean DEFAULT FALSE
+)
+RETURNS integer AS $$
+DECLARE
+    part record;
+    removed integer := 0;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = parent
+          AND c.relname ~ ('^' || parent::text || '_p[0-9]{4}_[0-9]{2}$')
+          AND (to_date(right(c.relname, 7), 'YYYY_MM') + interval '1 month')::date <= cutoff
+    LOOP
+        EXECUTE format('ALTER TABLE %s DETACH PARTITION %I', parent, part.relname);
+        IF NOT detach_only THEN
+            EXECUTE format('DROP TABLE %I', part.relname);
+        END IF;
+        removed := removed + 1;
+    END LOOP;
+    RETURN removed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ContextManager schema: conversations + messages
+CREATE TABLE IF NOT EXISTS conversations (
+    session_id UUID PRIMARY KEY,
+    user_id TEXT,
+    metadata JSONB DEFAULT '{}',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+DO $$
+DECLARE
+    month_start date;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class
+        WHERE relname = 'messages' AND relkind = 'r'
+          AND relnamespace = 'public'::regnamespace
+    ) THEN
+        RAISE NOTICE 'Converting messages to a partitioned table';
+
+        ALTER TABLE messages RENAME TO messages_unpartitioned;
+        ALTER TABLE messages_unpartitioned RENAME CONSTRAINT messages_pkey TO messages_unpartitioned_pkey;
+        ALTER INDEX IF EXISTS idx_messages_session_id RENAME TO idx_messages_unpartitioned_session_id;
+
+        CREATE TABLE messages (
+            id UUID NOT NULL,
+            session_id UUID REFERENCES conversations(session_id) ON DELETE CASCADE,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            metadata JSONB DEFAULT '{}',
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp);
+
+        FOR month_start IN
+            SELECT DISTINCT date_trunc('month', COALESCE(timestamp, CURRENT_TIMESTAMP))::date
+            FROM messages_unpartitioned
+        LOOP
+            PERFORM create_monthly_partition('messages', month_start);
+        END LOOP;
+
+        INSERT INTO messages (id, session_id, role, content, metadata, timestamp)
+        SELECT id, session_id, role, content, metadata, COALESCE(timestamp, CURRENT_TIMESTAMP)
+        FROM messages_unpartitioned;
+
+        DROP TABLE messages_unpartitioned;
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS messages (
+    id UUID NOT NULL,
+    session_id UUID REFERENCES conversations(session_id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    metadata JSONB DEFAULT '{}',
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Hot path: messages of one session in time order, pruned by timestamp
+CREATE INDEX IF NOT EXISTS idx_messages_session_ts ON messages(session_id, timestamp);
+
+SELECT ensure_monthly_partitions('messages');
+
+-- 001 schema: contexts
+DO $$
+DECLARE
+    month_start date;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class
+        WHERE relname = 'contexts' AND relkind = 'r'
+          AND relnamespace = 'public'::regnamespace
+    ) THEN
+        RAISE NOTICE 'Converting contexts to a partitioned table';
+
+        ALTER TABLE contexts RENAME TO contexts_unpartitioned;
+        ALTER TABLE contexts_unpartitioned RENAME CONSTRAINT contexts_pkey TO contexts_unpartitioned_pkey;
+        ALTER INDEX IF EXISTS idx_contexts_session_id RENAME TO idx_contexts_unpartitioned_session_id;
+        ALTER INDEX IF EXISTS idx_contexts_timestamp RENAME TO idx_contexts_unpartitioned_timestamp;
+
+        CREATE TABLE contexts (
+            id UUID NOT NULL DEFAULT gen_random_uuid(),
+            session_id UUID NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+            role VARCHAR(20) NOT NULL CHECK (role IN ('user', 'assistant', 'system')),
+            content TEXT NOT NULL,
+            timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            metadata JSONB DEFAULT '{}'::jsonb,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp);
+
+        FOR month_start IN
+            SELECT DISTINCT date_trunc('month', COALESCE(timestamp, CURRENT_TIMESTAMP))::date
+            FROM contexts_unpartitioned
+        LOOP
+            PERFORM create_monthly_partition('contexts', month_start);
+        END LOOP;
+
+        INSERT INTO contexts (id, session_id, role, content, timestamp, metadata)
+        SELECT id, session_id, role, content, COALESCE(timestamp, CURRENT_TIMESTAMP), metadata
+        FROM contexts_unpartitioned;
+
+        DROP TABLE contexts_unpartitioned;
+
+        CREATE INDEX IF NOT EXISTS idx_contexts_session_ts ON contexts(session_id, timestamp);
+        PERFORM ensure_monthly_partitions('contexts');
+    END IF;
+END $$;
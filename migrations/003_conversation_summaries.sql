@@ -0,0 +1,14 @@
+-- Versioned running summaries of compacted conversation history
+-- Written by ContextManager.compact_context; the latest version plus the
+-- messages after covers_until make up the active context of a session
+
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    session_id UUID REFERENCES conversations(session_id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    message_count INTEGER NOT NULL,
+    covers_until TIMESTAMP,
+    method TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (session_id, version)
+);
@@ -0,0 +1,57 @@
+"""
+Coalesced last-accessed bookkeeping
+Access timestamps are recorded in memory and written to PostgreSQL in one
+batched UPDATE per interval instead of one write per access
+"""
+
+from datetime import datetime
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class AccessTracker:
+    """
+    Latest access time per key, pending until the next flush
+    Repeated touches of a hot row between flushes collapse into one update
+    """
+
+    def __init__(self):
+        self._pending: Dict[Hashable, datetime] = {}
+
+        # Metrics
+        self.touches = 0
+        self.flushed = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def touch(self, key: Hashable, when: Optional[datetime] = None):
+        when = when or datetime.utcnow()
+        current = self._pending.get(key)
+        if current is None or when > current:
+            self._pending[key] = when
+        self.touches += 1
+
+    def last_seen(self, key: Hashable) -> Optional[datetime]:
+        """Unflushed access time for key, if any"""
+        return self._pending.get(key)
+
+    def drain(self) -> List[Tuple[Hashable, datetime]]:
+        """
+        Take every pending entry for flushing
+        Sorted by key so concurrent flushers lock rows in the same order
+        """
+        pending, self._pending = self._pending, {}
+        return sorted(pending.items(), key=lambda item: item[0])
+
+    def restore(self, entries: List[Tuple[Hashable, datetime]]):
+        """Put back entries whose flush failed, keeping newer touches"""
+        for key, when in entries:
+            self.touch(key, when)
+            self.touches -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "touches": self.touches,
+            "flushed": self.flushed
+        }
@@ -0,0 +1,175 @@
+"""
+Cache Policy for conversation contexts in Redis
+Decides what gets cached, for how long, and reports what occupies memory
+"""
+
+import os
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set, Union
+
+from core.redis_batch import RedisBatcher
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class ContextCachePolicy:
+    """
+    Memory-aware admission and eviction for cached contexts
+    - Sliding TTL: every cache hit pushes the expiry out again (GETEX)
+    - One-off sessions: a context that has never been read back gets a short
+      TTL, so single-use sessions leave the cache quickly
+    - Size-aware admission: contexts over `max_entry_bytes` are not cached and
+      are served from PostgreSQL instead
+    - Pinning: sessions active in SessionManager carry a long sliding TTL
+      (`pin_ttl`) instead of the normal one; never PERSIST, so pins left by
+      a crashed process still expire
+    - Accounting: MEMORY USAGE per key, summarized by report()
+    """
+
+    def __init__(self, batcher: RedisBatcher, prefix: str = "context:"):
+        self.batcher = batcher
+        self.prefix = prefix
+
+        self.ttl = int(os.getenv("CACHE_TTL", "3600"))
+        self.one_off_ttl = int(os.getenv("CACHE_ONE_OFF_TTL", "300"))
+        self.pin_ttl = int(os.getenv("CACHE_PIN_TTL", "86400"))
+        self.max_entry_bytes = int(os.getenv("CACHE_MAX_ENTRY_KB", "256")) * 1024
+
+        self.pinned: Set[str] = set()
+
+        # Sessions read back from the cache at least once (bounded)
+        self._reused: "OrderedDict[str, None]" = OrderedDict()
+        self._reused_limit = int(os.getenv("CACHE_REUSE_TRACKING", "10000"))
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.bytes_written = 0
+
+    def key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    async def read(self, session_id: str) -> Optional[Union[str, bytes]]:
+        """Read a cached context, sliding its TTL (the pin TTL if pinned)"""
+        ttl = self.pin_ttl if session_id in self.pinned else self.ttl
+        data = await self.batcher.submit("getex", self.key(session_id), ttl)
+
+        if data:
+            self.hits += 1
+            self._mark_reused(session_id)
+        else:
+            self.misses += 1
+        return data
+
+    async def write(self, session_id: str, payload: Union[str, bytes]) -> bool:
+        """Cache a serialized context if admission allows; returns whether it was cached"""
+        key = self.key(session_id)
+
+        if len(payload) > self.max_entry_bytes:
+            # Too large to cache in full: drop any stale copy and serve from
+            # PostgreSQL rather than evicting the hot working set
+            self.rejected += 1
+            await self.batcher.unlink(key)
+            logger.debug(f"Cache admission rejected {key} ({len(payload)} bytes)")
+            return False
+
+        if session_id in self.pinned:
+            await self.batcher.setex(key, self.pin_ttl, payload)
+        else:
+            ttl = self.ttl if session_id in self._reused else self.one_off_ttl
+            await self.batcher.setex(key, ttl, payload)
+
+        self.admitted += 1
+        self.bytes_written += len(payload)
+        return True
+
+    async def pin(self, session_id: str):
+        """Keep a session's context resident while the session is active"""
+        if session_id in self.pinned:
+            return
+        self.pinned.add(session_id)
+        self._mark_reused(session_id)
+        await self.batcher.submit("expire", self.key(session_id), self.pin_ttl)
+
+    async def unpin(self, session_id: str):
+        """Return a session's context to normal TTL-based expiry"""
+        if session_id not in self.pinned:
+            return
+        self.pinned.discard(session_id)
+        await self.batcher.submit("expire", self.key(session_id), self.ttl)
+
+    async def purge(self, *session_ids: str) -> int:
+        """Drop cached contexts (and their pins) with a single UNLINK"""
+        for session_id in session_ids:
+            self.pinned.discard(session_id)
+            self._reused.pop(session_id, None)
+        return await self.batcher.unlink(*[self.key(s) for s in session_ids])
+
+    def _mark_reused(self, session_id: str):
+        self._reused[session_id] = None
+        self._reused.move_to_end(session_id)
+        while len(self._reused) > self._reused_limit:
+            self._reused.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "bytes_written": self.bytes_written,
+            "pinned": len(self.pinned)
+        }
+
+    async def report(self, top: int = 20, scan_count: int = 500) -> Dict[str, Any]:
+        """
+        Report what occupies cache memory
+        Scans the context keys and measures each with MEMORY USAGE and TTL
+        """
+        client = self.batcher.client
+        keys = [key async for key in client.scan_iter(match=f"{self.prefix}*", count=scan_count)]
+
+        entries = []
+        for start in range(0, len(keys), scan_count):
+            chunk = keys[start:start + scan_count]
+            async with client.pipeline(transaction=False) as pipe:
+                for key in chunk:
+                    pipe.memory_usage(key)
+                    pipe.ttl(key)
+                results = await pipe.execute(raise_on_error=False)
+
+            for i, key in enumerate(chunk):
+                usage, ttl = results[2 * i], results[2 * i + 1]
+                if isinstance(usage, Exception) or usage is None:
+                    continue
+                key = key.decode() if isinstance(key, bytes) else key
+                entries.append({
+                    "key": key,
+                    "bytes": usage,
+                    "ttl": ttl if not isinstance(ttl, Exception) else None,
+                    "pinned": key[len(self.prefix):] in self.pinned
+                })
+
+        entries.sort(key=lambda e: e["bytes"], reverse=True)
+        total = sum(e["bytes"] for e in entries)
+        memory = await client.info("memory")
+
+        return {
+            "keys": len(entries),
+            "total_bytes": total,
+            "pinned_bytes": sum(e["bytes"] for e in entries if e["pinned"]),
+            "one_off_keys": sum(
+                1 for e in entries
+                if not e["pinned"] and e["ttl"] is not None and 0 < e["ttl"] <= self.one_off_ttl
+            ),
+            "largest": entries[:top],
+            "redis_used_memory": memory.get("used_memory"),
+            "redis_maxmemory": memory.get("maxmemory"),
+            "redis_maxmemory_policy": memory.get("maxmemory_policy"),
+            "policy": self.stats()
+        }
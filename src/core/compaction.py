@@ -0,0 +1,143 @@
+"""
+History Compaction
+Folds messages older than the working window into a running, versioned summary
+"""
+
+import os
+import re
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+# Stdlib logging only: the file-based SimpleContextManager uses this module
+# and must keep working without external dependencies
+logger = logging.getLogger(__name__)
+
+
+class HistoryCompactor:
+    """
+    Compacts long conversation histories
+    - Keeps the newest `working_window` messages verbatim
+    - Folds everything older into one running summary per (project, AI)
+    - Summarizes with a configured cheap model, or extractively as a fallback
+    - The summary never exceeds `max_summary_chars`, so injected context is
+      bounded by construction
+    """
+
+    def __init__(self, ai_router=None):
+        self.ai_router = ai_router
+        self.working_window = int(os.getenv("CONTEXT_WORKING_WINDOW", "20"))
+        self.compaction_threshold = int(
+            os.getenv("CONTEXT_COMPACTION_THRESHOLD", str(self.working_window * 2))
+        )
+        self.max_summary_chars = int(os.getenv("CONTEXT_SUMMARY_MAX_CHARS", "4000"))
+        self.max_line_chars = 160
+
+        # AI used for summaries (e.g. "gemini"); unset means extractive only
+        self.summary_ai = os.getenv("COMPACTION_AI", "")
+
+    def needs_compaction(self, message_count: int) -> bool:
+        """Whether a history of this length should be compacted"""
+        return message_count > self.compaction_threshold
+
+    def split(self, messages: List[Any]):
+        """Split messages into (to_fold, working_window)"""
+        if len(messages) <= self.working_window:
+            return [], list(messages)
+        return list(messages[:-self.working_window]), list(messages[-self.working_window:])
+
+    async def summarize(
+        self,
+        previous: Optional[Dict[str, Any]],
+        messages: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Fold messages into the previous summary and return the next version
+        Each message is a dict with "role", "content" and optional "timestamp"
+        """
+        previous = previous or {}
+        previous_text = previous.get("content", "")
+
+        text = None
+        method = "extractive"
+        if self.summary_ai and self.ai_router:
+            text = await self._model_summary(previous_text, messages)
+            if text:
+                method = self.summary_ai
+
+        if not text:
+            text = self._extractive_summary(previous_text, messages)
+
+        last_timestamp = messages[-1].get("timestamp") if messages else None
+        if isinstance(last_timestamp, datetime):
+            last_timestamp = last_timestamp.isoformat()
+
+        return {
+            "version": previous.get("version", 0) + 1,
+            "content": self._bound(text),
+            "message_count": previous.get("message_count", 0) + len(messages),
+            "covers_until": last_timestamp or previous.get("covers_until"),
+            "method": method,
+            "updated_at": datetime.utcnow().isoformat()
+        }
+
+    async def _model_summary(self, previous_text: str, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Ask the configured AI for an updated summary"""
+        transcript = "\n".join(
+            f"{m['role']}: {m['content'][:2000]}" for m in messages
+        )
+        prompt = (
+            "Update the running summary of an ongoing software project conversation. "
+            "Keep decisions, constraints, file names and open questions. "
+            f"Answer with the summary only, at most {self.max_summary_chars} characters.\n\n"
+            f"Current summary:\n{previous_text or '(none)'}\n\n"
+            f"New messages:\n{transcript}"
+        )
+
+        try:
+            response = await self.ai_router.route_request(
+                self.summary_ai, "ask", {"prompt": prompt}
+            )
+        except Exception as e:
+            logger.warning(f"Summary model call failed, using extractive summary: {e}")
+            return None
+
+        if not isinstance(response, dict) or response.get("error"):
+            return None
+        return response.get("content") or None
+
+    def _extractive_summary(self, previous_text: str, messages: List[Dict[str, Any]]) -> str:
+        """One leading sentence per message, appended to the previous summary"""
+        lines = previous_text.splitlines() if previous_text else []
+
+        for message in messages:
+            sentence = self._first_sentence(message.get("content", ""))
+            if sentence:
+                role = "Assistant" if message.get("role") == "assistant" else "User"
+                lines.append(f"- {role}: {sentence}")
+
+        return "\n".join(lines)
+
+    def _first_sentence(self, content: str) -> str:
+        """First sentence of a message, truncated to max_line_chars"""
+        content = content.strip()
+        if not content:
+            return ""
+
+        sentence = re.split(r"(?<=[.!?])\s+|\n", content, maxsplit=1)[0]
+        if len(sentence) > self.max_line_chars:
+            sentence = sentence[:self.max_line_chars - 3] + "..."
+        return sentence
+
+    def _bound(self, text: str) -> str:
+        """Drop the oldest lines until the summary fits max_summary_chars"""
+        if len(text) <= self.max_summary_chars:
+            return text
+
+        lines = text.splitlines()
+        while lines and len("\n".join(lines)) > self.max_summary_chars:
+            lines.pop(0)
+
+        if not lines:
+            return text[-self.max_summary_chars:]
+        return "\n".join(lines)
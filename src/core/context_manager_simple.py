@@ -1,23 +1,41 @@
 """
 Simple File-based Context Manager
-Stores context in JSON files without any external dependencies
+Stores context in an embedded SQLite database, or in append-only JSONL
+journals, without any external dependencies
 """
 
 import os
 import json
 import asyncio
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 from pathlib import Path
 import fcntl
 import tempfile
 import shutil
 
+from core.compaction import HistoryCompactor
+from core.session_locks import SessionLocks
+from core.sqlite_store import SQLiteContextStore
+from core.durability import BATCHED, NONE, STRICT, GroupSync, durability_level
+
+_TAIL_BLOCK = 64 * 1024
+
 
 class SimpleContextManager:
     """
-    Manages AI context using local JSON files
-    Storage structure: ~/.enhanced-mcp/contexts/{project_id}/{ai_name}.json
+    Manages AI context in local storage
+    CONTEXT_BACKEND=sqlite (default): ~/.enhanced-mcp/contexts.db, see
+    core.sqlite_store. Existing journals and JSON files are imported once
+    CONTEXT_BACKEND=files: ~/.enhanced-mcp/contexts/{project_id}/{ai_name}.jsonl
+    
+    Journal format, one JSON object per line:
+    - {"type": "header", ...}: project_id, ai_name, created_at, summary
+    - every other line is a message: {"role", "content", "timestamp"}
+    Adding a message appends one line. Once a journal holds more than
+    `journal_compact_at` message lines it is rewritten in the background,
+    keeping the newest `max_messages`. Legacy {ai_name}.json files are
+    converted on first access
     """
     
     def __init__(self):
@@ -25,179 +43,581 @@ class SimpleContextManager:
         self.storage_root = os.path.expanduser("~/.enhanced-mcp/contexts")
         self.max_messages = 100  # Keep last 100 messages per AI
         self.lock_timeout = 5  # seconds
+        self.journal_compact_at = int(
+            os.getenv("CONTEXT_JOURNAL_COMPACT_AT", str(self.max_messages * 2))
+        )
+        
+        # none / batched / strict, see core.durability
+        self.durability = durability_level()
+        self.group_sync = GroupSync()
+        
+        # Messages beyond the working window are folded into context["summary"]
+        self.compactor = HistoryCompactor()
+        self._compacting = set()
+        
+        # Read-modify-write of one context file runs one at a time per
+        # (project, AI); other files are updated in parallel
+        self.locks = SessionLocks("context file")
+        
+        # Message lines per journal, as last seen by this process
+        self._line_counts: Dict[tuple, int] = {}
+        self._migrated = set()
+        
+        self.db: Optional[SQLiteContextStore] = None
+        self._import = None
+        if os.getenv("CONTEXT_BACKEND", "sqlite") == "sqlite":
+            db_path = os.getenv("CONTEXT_DB_PATH") or os.path.join(
+                os.path.dirname(self.storage_root), "contexts.db"
+            )
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self.db = SQLiteContextStore(db_path, self.max_messages, durability=self.durability)
+            self._import = self.db.import_contexts("simple-context-files", self._file_contexts())
+    
+    async def _db_ready(self) -> SQLiteContextStore:
+        """The database, once the one-time import of context files is done"""
+        pending = self._import
+        if pending is not None:
+            try:
+                imported = await asyncio.wrap_future(pending)
+            except Exception as e:
+                imported = e
+            if self._import is pending:
+                self._import = None
+                if isinstance(imported, Exception):
+                    print(f"Error importing contexts: {imported}", file=os.sys.stderr)
+                elif imported:
+                    print(f"Imported {imported} contexts into {self.db.path}", file=os.sys.stderr)
+        return self.db
+    
+    def _file_contexts(self):
+        """Every context stored as a journal or legacy JSON file"""
+        if not os.path.isdir(self.storage_root):
+            return
+        for project_dir in sorted(os.listdir(self.storage_root)):
+            path = os.path.join(self.storage_root, project_dir)
+            if not os.path.isdir(path):
+                continue
+            for filename in sorted(os.listdir(path)):
+                name, extension = os.path.splitext(filename)
+                try:
+                    if extension == ".jsonl":
+                        context = self._read_journal(os.path.join(path, filename))
+                    elif extension == ".json" and not os.path.exists(os.path.join(path, name + ".jsonl")):
+                        with open(os.path.join(path, filename), 'r') as f:
+                            context = json.load(f)
+                    else:
+                        continue
+                except Exception as e:
+                    print(f"Skipping unreadable context {filename}: {e}", file=os.sys.stderr)
+                    continue
+                if isinstance(context, dict):
+                    context.setdefault("project_id", project_dir)
+                    context.setdefault("ai_name", name)
+                    yield context
     
     async def ensure_storage_dir(self):
         """Ensure storage directory exists"""
         Path(self.storage_root).mkdir(parents=True, exist_ok=True)
     
-    def _get_context_path(self, project_id: str, ai_name: str) -> str:
+    def _project_dir(self, project_id: str) -> str:
+        safe_project_id = "".join(c for c in project_id if c.isalnum() or c in "._-")
+        return os.path.join(self.storage_root, safe_project_id)
+    
+    def _get_context_path(self, project_id: str, ai_name: str, extension: str = ".jsonl") -> str:
         """Get path to context file"""
         # Sanitize project_id and ai_name to be filesystem-safe
-        safe_project_id = "".join(c for c in project_id if c.isalnum() or c in "._-")
         safe_ai_name = "".join(c for c in ai_name if c.isalnum() or c in "._-")
         
-        project_dir = os.path.join(self.storage_root, safe_project_id)
+        project_dir = self._project_dir(project_id)
         os.makedirs(project_dir, exist_ok=True)
         
-        return os.path.join(project_dir, f"{safe_ai_name}.json")
+        return os.path.join(project_dir, f"{safe_ai_name}{extension}")
     
-    async def get_context(self, project_id: str, ai_name: str) -> Optional[Dict[str, Any]]:
-        """Get context for an AI in a project"""
+    def _journal_path(self, project_id: str, ai_name: str) -> str:
+        """Path to the journal, converting a legacy JSON file first"""
+        key = (project_id, ai_name)
         context_path = self._get_context_path(project_id, ai_name)
+        if key in self._migrated:
+            return context_path
         
-        if not os.path.exists(context_path):
-            return None
-        
-        try:
-            # Read with file locking
-            with open(context_path, 'r') as f:
-                # Try to acquire lock (non-blocking)
-                try:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
-                    content = f.read()
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                    
-                    if content:
-                        return json.loads(content)
-                except (IOError, OSError):
-                    # If can't get lock, try reading anyway (might get partial data)
-                    content = f.read()
+        legacy_path = self._get_context_path(project_id, ai_name, ".json")
+        if os.path.exists(legacy_path):
+            try:
+                if not os.path.exists(context_path):
+                    with open(legacy_path, 'r') as f:
+                        content = f.read()
                     if content:
-                        try:
-                            return json.loads(content)
-                        except json.JSONDecodeError:
-                            return None
-                
-        except Exception as e:
-            # Log error but don't crash
-            print(f"Error reading context: {e}", file=os.sys.stderr)
-            return None
+                        context = json.loads(content)
+                        self._rewrite(context_path, lambda _: context)
+                os.unlink(legacy_path)
+            except Exception as e:
+                print(f"Error migrating context: {e}", file=os.sys.stderr)
+                return context_path
         
-        return None
+        self._migrated.add(key)
+        return context_path
     
-    async def save_context(self, project_id: str, ai_name: str, context: Dict[str, Any]):
-        """Save context for an AI in a project"""
-        context_path = self._get_context_path(project_id, ai_name)
-        
-        # Ensure messages list exists
-        if "messages" not in context:
-            context["messages"] = []
+    @staticmethod
+    def _parse(lines) -> Optional[Dict[str, Any]]:
+        """Build a context dict from journal lines; torn or corrupt lines are skipped"""
+        header: Dict[str, Any] = {}
+        messages = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            if record.get("type") == "header":
+                # Concurrent first writers may each add a header; the first
+                # creation time wins, later fields (summary) override
+                created_at = header.get("created_at")
+                header.update(record)
+                if created_at:
+                    header["created_at"] = created_at
+            else:
+                messages.append(record)
         
-        # Trim to max messages
-        if len(context["messages"]) > self.max_messages:
-            context["messages"] = context["messages"][-self.max_messages:]
+        if not header and not messages:
+            return None
         
-        # Update metadata
-        context["updated_at"] = datetime.utcnow().isoformat()
-        if "created_at" not in context:
-            context["created_at"] = context["updated_at"]
+        context = {k: v for k, v in header.items() if k != "type"}
+        context["messages"] = messages
+        if messages and messages[-1].get("timestamp"):
+            context["updated_at"] = max(context.get("updated_at", ""), messages[-1]["timestamp"])
+        return context
+    
+    def _read_journal(self, context_path: str) -> Optional[Dict[str, Any]]:
+        with open(context_path, 'rb') as f:
+            return self._parse(f.read().decode('utf-8', errors='replace').splitlines())
+    
+    def _header(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        header = {"type": "header"}
+        for field, value in context.items():
+            if field != "messages":
+                header[field] = value
+        return header
+    
+    def _append(self, context_path: str, header: Dict[str, Any], messages: List[Dict[str, Any]]):
+        """
+        Append message lines, writing the header first into a new journal
+        Appends hold an exclusive flock; if the journal was replaced by a
+        compaction while waiting for it, the new file is opened instead
+        Only strict durability syncs here; batched callers await group_sync
+        """
+        lines = "".join(json.dumps(m) + "\n" for m in messages)
+        while True:
+            fd = os.open(context_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    current = os.stat(context_path)
+                except FileNotFoundError:
+                    continue
+                stat = os.fstat(fd)
+                if (stat.st_dev, stat.st_ino) != (current.st_dev, current.st_ino):
+                    continue
+                
+                data = lines
+                if stat.st_size == 0:
+                    data = json.dumps(header) + "\n" + data
+                elif os.pread(fd, 1, stat.st_size - 1) != b"\n":
+                    # Terminate a line torn by a crash rather than extend it
+                    data = "\n" + data
+                os.write(fd, data.encode('utf-8'))
+                if self.durability == STRICT:
+                    os.fsync(fd)
+                return
+            finally:
+                os.close(fd)
+    
+    def _rewrite(
+        self,
+        context_path: str,
+        transform: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Atomically replace the journal with transform(current context)
+        The current journal is read under its exclusive flock, so no append
+        or other rewrite lands between the read and the rename
+        """
+        while True:
+            fd = os.open(context_path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = os.stat(context_path)
+            except FileNotFoundError:
+                current = None
+            stat = os.fstat(fd)
+            if current and (stat.st_dev, stat.st_ino) == (current.st_dev, current.st_ino):
+                break
+            # Replaced by another writer while waiting; lock the new file
+            os.close(fd)
         
         try:
+            with os.fdopen(os.dup(fd), 'rb') as f:
+                current = self._parse(f.read().decode('utf-8', errors='replace').splitlines())
+            
+            context = transform(current)
+            if context is None:
+                return current
+            
+            # Ensure messages list exists
+            if "messages" not in context:
+                context["messages"] = []
+            
+            # Trim to max messages
+            if len(context["messages"]) > self.max_messages:
+                context["messages"] = context["messages"][-self.max_messages:]
+            
+            # Update metadata
+            context["updated_at"] = datetime.utcnow().isoformat()
+            if "created_at" not in context:
+                context["created_at"] = context["updated_at"]
+            
             # Write to temporary file first (atomic write)
             temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(context_path))
             try:
                 with os.fdopen(temp_fd, 'w') as f:
-                    # Try to acquire exclusive lock
-                    try:
-                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-                        json.dump(context, f, indent=2)
-                        f.flush()
-                        os.fsync(f.fileno())
-                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                    except (IOError, OSError):
-                        # If can't get lock, write anyway
-                        json.dump(context, f, indent=2)
-                        f.flush()
+                    f.write(json.dumps(self._header(context)) + "\n")
+                    for message in context["messages"]:
+                        f.write(json.dumps(message) + "\n")
+                    f.flush()
+                    if self.durability != NONE:
                         os.fsync(f.fileno())
                 
                 # Atomic rename
-                shutil.move(temp_path, context_path)
-                
+                os.replace(temp_path, context_path)
             except Exception:
                 # Clean up temp file on error
                 if os.path.exists(temp_path):
                     os.unlink(temp_path)
                 raise
-                
+            
+            return context
+        finally:
+            os.close(fd)
+    
+    def _message_count(self, context_path: str, key: tuple) -> int:
+        """Message lines in the journal, counted once per process"""
+        count = self._line_counts.get(key)
+        if count is None:
+            context = self._read_journal(context_path) if os.path.exists(context_path) else None
+            count = len(context["messages"]) if context else 0
+            self._line_counts[key] = count
+        return count
+    
+    async def get_context(self, project_id: str, ai_name: str) -> Optional[Dict[str, Any]]:
+        """Get context for an AI in a project"""
+        if self.db:
+            return (await self._db_ready()).get_context(project_id, ai_name)
+        
+        context_path = self._journal_path(project_id, ai_name)
+        
+        if not os.path.exists(context_path):
+            return None
+        
+        try:
+            # Journals are only ever appended to or atomically replaced,
+            # so reads need no lock
+            context = self._read_journal(context_path)
+        except Exception as e:
+            # Log error but don't crash
+            print(f"Error reading context: {e}", file=os.sys.stderr)
+            return None
+        
+        if context is None:
+            return None
+        
+        self._line_counts[(project_id, ai_name)] = len(context["messages"])
+        context.setdefault("project_id", project_id)
+        context.setdefault("ai_name", ai_name)
+        if len(context["messages"]) > self.max_messages:
+            context["messages"] = context["messages"][-self.max_messages:]
+        return context
+    
+    async def get_recent_messages(self, project_id: str, ai_name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        The newest `limit` messages, read from the end of the journal
+        Only the blocks holding those lines are read, however long the file
+        """
+        limit = min(limit, self.max_messages)
+        if limit <= 0:
+            return []
+        if self.db:
+            return (await self._db_ready()).recent(project_id, ai_name, limit)
+        
+        context_path = self._journal_path(project_id, ai_name)
+        if not os.path.exists(context_path):
+            return []
+        
+        try:
+            with open(context_path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                position = f.tell()
+                data = b""
+                # One line more than needed: the first one may be partial
+                while position > 0 and data.count(b"\n") <= limit:
+                    step = min(_TAIL_BLOCK, position)
+                    position -= step
+                    f.seek(position)
+                    data = f.read(step) + data
+        except Exception as e:
+            print(f"Error reading context: {e}", file=os.sys.stderr)
+            return []
+        
+        lines = data.decode('utf-8', errors='replace').splitlines()
+        if position > 0:
+            lines = lines[1:]
+        context = self._parse(lines)
+        if not context:
+            return []
+        return context["messages"][-limit:]
+    
+    async def save_context(self, project_id: str, ai_name: str, context: Dict[str, Any]):
+        """Save context for an AI in a project, replacing its history"""
+        try:
+            if self.db:
+                db = await self._db_ready()
+                await asyncio.wrap_future(
+                    db.update(project_id, ai_name, lambda _: context, datetime.utcnow().isoformat())
+                )
+                return
+            
+            context_path = self._journal_path(project_id, ai_name)
+            saved = self._rewrite(context_path, lambda _: context)
+            self._line_counts[(project_id, ai_name)] = len(saved["messages"])
         except Exception as e:
             print(f"Error saving context: {e}", file=os.sys.stderr)
-            # Try direct write as fallback
-            try:
-                with open(context_path, 'w') as f:
-                    json.dump(context, f, indent=2)
-            except:
-                pass
     
     async def add_message(self, project_id: str, ai_name: str, role: str, content: str):
         """Add a message to the context"""
-        # Get existing context or create new
-        context = await self.get_context(project_id, ai_name)
-        if not context:
-            context = {
-                "project_id": project_id,
-                "ai_name": ai_name,
-                "messages": [],
-                "created_at": datetime.utcnow().isoformat()
-            }
-        
-        # Add message
+        key = (project_id, ai_name)
+        now = datetime.utcnow().isoformat()
         message = {
             "role": role,
             "content": content,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": now
         }
         
-        context["messages"].append(message)
+        if self.db:
+            # Ordered by the writer thread; no file lock needed
+            db = await self._db_ready()
+            try:
+                count = await asyncio.wrap_future(db.append(project_id, ai_name, [message]))
+            except Exception as e:
+                print(f"Error saving context: {e}", file=os.sys.stderr)
+                return
+        else:
+            async with self.locks.hold(key):
+                context_path = self._journal_path(project_id, ai_name)
+                count = self._message_count(context_path, key)
+                header = {
+                    "type": "header",
+                    "project_id": project_id,
+                    "ai_name": ai_name,
+                    "created_at": now
+                }
+                
+                try:
+                    self._append(context_path, header, [message])
+                except Exception as e:
+                    print(f"Error saving context: {e}", file=os.sys.stderr)
+                    return
+                count = self._line_counts[key] = count + 1
+            
+            if self.durability == BATCHED:
+                # Outside the lock, so this session's next append can join
+                # the same batch
+                try:
+                    await self.group_sync.sync(context_path)
+                except Exception as e:
+                    print(f"Error syncing context: {e}", file=os.sys.stderr)
         
-        # Save context
-        await self.save_context(project_id, ai_name, context)
+        if key in self._compacting:
+            return
+        
+        # Fold old messages into the running summary in the background;
+        # that rewrite also trims the journal
+        if self.compactor.needs_compaction(min(count, self.max_messages)):
+            self._compacting.add(key)
+            asyncio.create_task(self._run_compaction(project_id, ai_name))
+        elif not self.db and count > self.journal_compact_at:
+            self._compacting.add(key)
+            asyncio.create_task(self._run_journal_compaction(project_id, ai_name))
     
-    async def clear_context(self, project_id: str, ai_name: str):
-        """Clear context for an AI in a project"""
-        context_path = self._get_context_path(project_id, ai_name)
+    async def compact_journal(self, project_id: str, ai_name: str):
+        """Rewrite the journal with only the newest max_messages messages"""
+        key = (project_id, ai_name)
+        async with self.locks.hold(key):
+            context_path = self._journal_path(project_id, ai_name)
+            if not os.path.exists(context_path):
+                return
+            
+            context = self._rewrite(context_path, lambda current: current)
+            self._line_counts[key] = len(context["messages"]) if context else 0
+    
+    async def _run_journal_compaction(self, project_id: str, ai_name: str):
+        """Background wrapper for compact_journal"""
+        try:
+            await self.compact_journal(project_id, ai_name)
+        except Exception as e:
+            print(f"Error compacting journal: {e}", file=os.sys.stderr)
+        finally:
+            self._compacting.discard((project_id, ai_name))
+    
+    async def compact_context(self, project_id: str, ai_name: str) -> Optional[Dict[str, Any]]:
+        """Fold messages older than the working window into the running summary"""
+        context = await self.get_context(project_id, ai_name)
+        if not context:
+            return None
+        
+        to_fold, _ = self.compactor.split(context.get("messages", []))
+        if not to_fold:
+            return context.get("summary")
         
+        summary = await self.compactor.summarize(context.get("summary"), to_fold)
+        
+        def fold(current):
+            # Re-read: messages may have been appended while summarizing
+            current = current or context
+            folded = {(m.get("timestamp"), m.get("role"), m.get("content")) for m in to_fold}
+            current["messages"] = [
+                m for m in current.get("messages", [])
+                if (m.get("timestamp"), m.get("role"), m.get("content")) not in folded
+            ]
+            current["summary"] = summary
+            return current
+        
+        if self.db:
+            await asyncio.wrap_future(
+                self.db.update(project_id, ai_name, fold, datetime.utcnow().isoformat())
+            )
+            return summary
+        
+        async with self.locks.hold((project_id, ai_name)):
+            context_path = self._journal_path(project_id, ai_name)
+            saved = self._rewrite(context_path, fold)
+            self._line_counts[(project_id, ai_name)] = len(saved["messages"])
+        return summary
+    
+    async def _run_compaction(self, project_id: str, ai_name: str):
+        """Background wrapper for compact_context"""
         try:
-            if os.path.exists(context_path):
-                os.unlink(context_path)
+            await self.compact_context(project_id, ai_name)
         except Exception as e:
-            print(f"Error clearing context: {e}", file=os.sys.stderr)
+            print(f"Error compacting context: {e}", file=os.sys.stderr)
+        finally:
+            self._compacting.discard((project_id, ai_name))
+    
+    async def clear_context(self, project_id: str, ai_name: str):
+        """Clear context for an AI in a project"""
+        key = (project_id, ai_name)
+        
+        if self.db:
+            db = await self._db_ready()
+            try:
+                await asyncio.wrap_future(db.clear(project_id, ai_name))
+            except Exception as e:
+                print(f"Error clearing context: {e}", file=os.sys.stderr)
+            return
+        
+        async with self.locks.hold(key):
+            try:
+                for extension in (".jsonl", ".json"):
+                    context_path = self._get_context_path(project_id, ai_name, extension)
+                    if os.path.exists(context_path):
+                        os.unlink(context_path)
+            except Exception as e:
+                print(f"Error clearing context: {e}", file=os.sys.stderr)
+            self._line_counts.pop(key, None)
     
     async def clear_project(self, project_id: str):
         """Clear all contexts for a project"""
-        safe_project_id = "".join(c for c in project_id if c.isalnum() or c in "._-")
-        project_dir = os.path.join(self.storage_root, safe_project_id)
+        if self.db:
+            db = await self._db_ready()
+            try:
+                await asyncio.wrap_future(db.clear(project_id))
+            except Exception as e:
+                print(f"Error clearing project: {e}", file=os.sys.stderr)
+            return
+        
+        project_dir = self._project_dir(project_id)
         
         try:
             if os.path.exists(project_dir):
                 shutil.rmtree(project_dir)
         except Exception as e:
             print(f"Error clearing project: {e}", file=os.sys.stderr)
+        
+        for key in [k for k in self._line_counts if k[0] == project_id]:
+            del self._line_counts[key]
     
     async def list_projects(self) -> List[str]:
         """List all projects with contexts"""
         try:
+            if self.db:
+                return (await self._db_ready()).list_projects()
+            
             if not os.path.exists(self.storage_root):
                 return []
             
-            return [d for d in os.listdir(self.storage_root) 
+            return [d for d in os.listdir(self.storage_root)
                     if os.path.isdir(os.path.join(self.storage_root, d))]
         except Exception:
             return []
     
     async def list_ais_in_project(self, project_id: str) -> List[str]:
         """List all AIs with context in a project"""
-        safe_project_id = "".join(c for c in project_id if c.isalnum() or c in "._-")
-        project_dir = os.path.join(self.storage_root, safe_project_id)
+        project_dir = self._project_dir(project_id)
         
         try:
+            if self.db:
+                return (await self._db_ready()).list_ais(project_id)
+            
             if not os.path.exists(project_dir):
                 return []
             
             ai_names = []
-            for filename in os.listdir(project_dir):
-                if filename.endswith('.json'):
-                    ai_names.append(filename[:-5])  # Remove .json extension
+            for filename in sorted(os.listdir(project_dir)):
+                # Journals, and legacy files not yet converted
+                name, extension = os.path.splitext(filename)
+                if extension in (".jsonl", ".json") and name not in ai_names:
+                    ai_names.append(name)
             
             return ai_names
         except Exception:
-            return []
\ No newline at end of file
+            return []
+    
+    async def search(
+        self,
+        text: str,
+        project_id: Optional[str] = None,
+        ai_name: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Messages containing every word of text (full-text search with SQLite)"""
+        if self.db:
+            return (await self._db_ready()).search(text, project_id, ai_name, limit)
+        
+        # Files: scan the journals
+        words = [w.lower() for w in text.split()]
+        if not words:
+            return []
+        
+        results = []
+        projects = [project_id] if project_id is not None else await self.list_projects()
+        for project in projects:
+            ais = [ai_name] if ai_name is not None else await self.list_ais_in_project(project)
+            for ai in ais:
+                context = await self.get_context(project, ai)
+                for message in (context or {}).get("messages", []):
+                    content = message.get("content", "")
+                    if all(w in content.lower() for w in words):
+                        results.append({"project_id": project, "ai_name": ai, **message})
+        
+        results.sort(key=lambda m: m.get("timestamp", ""), reverse=True)
+        return results[:limit]
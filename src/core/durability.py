@@ -0,0 +1,103 @@
+"""
+Durability levels for the local context stores
+- none: writes reach the OS, nothing is synced; a crash can lose recent
+  messages (never corrupt history)
+- batched: writes from all sessions are group-committed every
+  CONTEXT_GROUP_COMMIT_MS with one sync per batch; a write is
+  acknowledged once its batch is synced
+- strict: every write is synced on its own before it is acknowledged
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+# Stdlib logging only: the file-based SimpleContextManager uses this module
+logger = logging.getLogger(__name__)
+
+NONE = "none"
+BATCHED = "batched"
+STRICT = "strict"
+LEVELS = (NONE, BATCHED, STRICT)
+
+
+def durability_level(value: Optional[str] = None) -> str:
+    """The configured level (CONTEXT_DURABILITY), batched if unset or unknown"""
+    level = (value or os.getenv("CONTEXT_DURABILITY") or BATCHED).lower()
+    if level not in LEVELS:
+        logger.warning(f"Unknown CONTEXT_DURABILITY {level!r}, using {BATCHED}")
+        return BATCHED
+    return level
+
+
+def group_commit_interval(value: Optional[float] = None) -> float:
+    """Seconds a batch stays open for more writes (CONTEXT_GROUP_COMMIT_MS)"""
+    if value is not None:
+        return value
+    return float(os.getenv("CONTEXT_GROUP_COMMIT_MS", "2")) / 1000
+
+
+class GroupSync:
+    """
+    fsync for files written by many sessions, once per batch
+    Callers write without syncing, then await sync(path): every file
+    written during the open interval is synced once, in a worker thread,
+    and all waiters resume together
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = group_commit_interval(interval)
+        self._paths: Dict[str, None] = {}
+        self._batch: Optional[asyncio.Future] = None
+
+        # Metrics
+        self.batches = 0
+        self.syncs = 0
+        self.writes = 0
+
+    async def sync(self, path: str):
+        self._paths[path] = None
+        self.writes += 1
+        if self._batch is None:
+            self._batch = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self._flush(self._batch))
+        await asyncio.shield(self._batch)
+
+    async def _flush(self, batch: asyncio.Future):
+        await asyncio.sleep(self.interval)
+
+        # Writes arriving while this batch syncs go into the next one
+        paths = list(self._paths)
+        self._paths.clear()
+        self._batch = None
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._fsync, paths)
+        except Exception as e:
+            batch.set_exception(e)
+            batch.exception()  # Retrieved here; waiters get it re-raised
+            return
+        self.batches += 1
+        self.syncs += len(paths)
+        batch.set_result(None)
+
+    @staticmethod
+    def _fsync(paths):
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                # Cleared, or replaced by a rewrite that synced itself
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_ms": self.interval * 1000,
+            "batches": self.batches,
+            "syncs": self.syncs,
+            "writes": self.writes
+        }
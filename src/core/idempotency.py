@@ -0,0 +1,150 @@
+"""
+Idempotent tool calls
+Results of completed calls are kept for a short time under an idempotency
+key, so a client retry returns the stored result instead of calling the
+provider again and writing the exchange into history twice
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from core.session_cache import SessionLRU
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_MISSING = object()
+
+
+def idempotency_key(
+    params: Dict[str, Any],
+    request_id: Any = None,
+    scope: str = "",
+    client_id: Optional[str] = None
+) -> Optional[str]:
+    """
+    Key for a tools/call: the client's own key if it sent one (params
+    "idempotency_key" or _meta "idempotencyKey"), otherwise the calling
+    client's id, the request id and a hash of the whole params (but _meta
+    and the key itself), so any change to the payload is a new call.
+    Request ids restart on every connection, so without a client id
+    nothing is derived and the call is not deduplicated
+    Must be computed before context is injected into params
+    """
+    meta = params.get("_meta") or {}
+    client_key = params.get("idempotency_key") or meta.get("idempotencyKey")
+    if client_key:
+        return f"{scope}:client:{client_key}"
+
+    if request_id is None or client_id is None:
+        return None
+
+    payload = json.dumps(
+        {k: v for k, v in params.items() if k not in ("_meta", "idempotency_key")},
+        sort_keys=True, default=str
+    )
+    digest = hashlib.sha256(payload.encode()).hexdigest()
+    return f"{scope}:request:{client_id}:{request_id}:{digest}"
+
+
+class IdempotencyStore:
+    """
+    Short-lived results keyed by idempotency key
+    - Redis when a client is given, so retries hitting another instance are
+      answered too; in-process otherwise, or when Redis is unavailable
+    - A retry arriving while the first call is still running waits for it
+      instead of starting a second one
+    - Only successful results are stored; a failed call can be retried
+    """
+
+    def __init__(self, client=None, ttl: Optional[int] = None):
+        # A redis.asyncio client; set after startup once Redis is connected
+        self.client = client
+        self.ttl = ttl or int(os.getenv("IDEMPOTENCY_TTL", "600"))
+        self.prefix = "idempotency:"
+
+        self._local: SessionLRU[str, tuple] = SessionLRU(
+            max_size=int(os.getenv("IDEMPOTENCY_LOCAL_MAX", "10000"))
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # Metrics
+        self.hits = 0
+        self.joined = 0
+        self.stored = 0
+
+    async def run(self, key: Optional[str], call: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the stored result for key, or run call once and store it"""
+        if key is None:
+            return await call()
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.joined += 1
+            return await asyncio.shield(inflight)
+
+        # Registered before the lookup so a concurrent retry joins this one
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._get(key)
+            if result is not _MISSING:
+                self.hits += 1
+                future.set_result(result)
+                return result
+
+            result = await call()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Retrieved here; joiners get it re-raised
+            raise
+        else:
+            await self._put(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _get(self, key: str) -> Any:
+        if self.client is not None:
+            try:
+                data = await self.client.get(self.prefix + key)
+                if data is not None:
+                    return json.loads(data)
+            except Exception as e:
+                logger.warning(f"Idempotency lookup failed, checking locally: {str(e)}")
+
+        entry = self._local.get(key)
+        if entry is not None:
+            expires, result = entry
+            if expires > time.monotonic():
+                return result
+            self._local.pop(key, None)
+        return _MISSING
+
+    async def _put(self, key: str, result: Any):
+        if self.client is not None:
+            try:
+                await self.client.set(self.prefix + key, json.dumps(result, default=str), ex=self.ttl)
+                self.stored += 1
+                return
+            except Exception as e:
+                logger.warning(f"Idempotency store failed, keeping locally: {str(e)}")
+
+        self._local[key] = (time.monotonic() + self.ttl, result)
+        self.stored += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self.client is not None else "local",
+            "ttl": self.ttl,
+            "inflight": len(self._inflight),
+            "local": len(self._local),
+            "hits": self.hits,
+            "joined": self.joined,
+            "stored": self.stored
+        }
@@ -0,0 +1,120 @@
+"""
+Rendered context injection cache
+Keeps the injection payload (summary text or chat message list) built for
+each session, extending it with newly appended messages instead of
+re-rendering the whole window on every request
+"""
+
+import os
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+from core.session_cache import SessionLRU
+
+
+def context_version(context) -> Tuple[Hashable, ...]:
+    """
+    Everything a payload depends on besides the message tail
+    Compaction bumps the summary version; a clear starts a new session
+    """
+    summary = context.summary or {}
+    project = context.project_context or {}
+    return (
+        summary.get("version"),
+        project.get("name"),
+        project.get("path"),
+        tuple(project.get("current_files", ())[:5]),
+        context.metadata.get("active_debug_session")
+    )
+
+
+class RenderedContext:
+    """A rendered payload and the pieces it was assembled from"""
+    __slots__ = ("version", "last_id", "head", "items", "tail", "payload")
+
+    def __init__(self, version: Tuple[Hashable, ...], head: Any, tail: Any, window: int):
+        self.version = version
+        self.last_id: Optional[str] = None
+        self.head = head
+        self.items: Deque[Any] = deque(maxlen=window)
+        self.tail = tail
+        self.payload: Any = None
+
+
+class InjectionCache:
+    """
+    Payloads keyed by (session, AI, format), valid for one context version
+    - Same version and same last message: the cached payload is returned
+    - Messages appended since: only those are rendered, the window slides
+    - Otherwise (new version, gap larger than the window): full render
+    Callers render through three callbacks:
+        render_frame(context, ai_name) -> (head, tail)
+        render_message(message) -> item
+        assemble(head, items, tail) -> payload
+    Cached payloads are shared; callers must not mutate them
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None):
+        self.entries: SessionLRU[Tuple[str, str, str], RenderedContext] = SessionLRU(
+            max_size=max_sessions or int(os.getenv("INJECTION_CACHE_SESSIONS", "1000"))
+        )
+
+        # Metrics
+        self.hits = 0
+        self.appends = 0
+        self.renders = 0
+
+    def get(
+        self,
+        context,
+        ai_name: str,
+        fmt: str,
+        window: int,
+        render_frame: Callable[[Any, str], Tuple[Any, Any]],
+        render_message: Callable[[Any], Any],
+        assemble: Callable[[Any, Deque[Any], Any], Any]
+    ) -> Any:
+        key = (context.session_id, ai_name, fmt)
+        version = context_version(context)
+        messages = context.messages
+
+        entry = self.entries.get(key)
+        if entry is not None and entry.version == version:
+            new_messages = self._appended(entry, messages, window)
+            if new_messages is not None:
+                if not new_messages:
+                    self.hits += 1
+                    return entry.payload
+
+                entry.items.extend(render_message(m) for m in new_messages)
+                entry.last_id = new_messages[-1].id
+                entry.payload = assemble(entry.head, entry.items, entry.tail)
+                self.appends += 1
+                return entry.payload
+
+        head, tail = render_frame(context, ai_name)
+        entry = RenderedContext(version, head, tail, window)
+        entry.items.extend(render_message(m) for m in messages[-window:])
+        entry.last_id = messages[-1].id if messages else None
+        entry.payload = assemble(entry.head, entry.items, entry.tail)
+        self.entries[key] = entry
+        self.renders += 1
+        return entry.payload
+
+    @staticmethod
+    def _appended(entry: RenderedContext, messages, window: int):
+        """Messages after the last rendered one, or None if it is not in the window"""
+        if entry.last_id is None:
+            return None
+        for offset in range(1, min(window, len(messages)) + 1):
+            if messages[-offset].id == entry.last_id:
+                return messages[len(messages) - offset + 1:]
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.entries.stats(),
+            "hits": self.hits,
+            "appends": self.appends,
+            "renders": self.renders
+        }
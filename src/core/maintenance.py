@@ -0,0 +1,253 @@
+"""
+Background maintenance
+Leader-elected scheduler running cleanup, summarization and vacuum jobs in
+small, paced batches on exactly one server instance
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import redis.asyncio as redis
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# A job run: an async generator yielding the rows affected by each batch
+JobRun = Callable[[int], AsyncIterator[int]]
+
+# Compare-and-set lease scripts: only the holder may renew or release
+_RENEW_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class MaintenanceJob:
+    """A registered job and its run statistics"""
+
+    def __init__(self, name: str, interval: float, run: JobRun, batch_size: int):
+        self.name = name
+        self.interval = interval
+        self.run = run
+        self.batch_size = batch_size
+
+        self.last_finished: float = 0.0
+        self.runs = 0
+        self.last_duration_ms = 0.0
+        self.last_rows = 0
+        self.last_batches = 0
+        self.total_rows = 0
+        self.last_error: Optional[str] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "runs": self.runs,
+            "last_finished": self.last_finished,
+            "last_duration_ms": self.last_duration_ms,
+            "last_rows": self.last_rows,
+            "last_batches": self.last_batches,
+            "total_rows": self.total_rows,
+            "last_error": self.last_error
+        }
+
+
+class MaintenanceScheduler:
+    """
+    Runs maintenance jobs on the instance holding a Redis lease
+    - Leadership: SET NX EX on `lease_key`, renewed every tick and by a
+      heartbeat while a job runs; another instance takes over within
+      `lease_ttl` seconds if the leader dies
+    - Jobs are async generators that do one keyset-limited batch per step;
+      the scheduler pauses between batches, and a job is cancelled mid-batch
+      as soon as a lease renewal fails
+    - Per-job duration and rows affected are logged, kept in memory and
+      written to a Redis hash so any instance can report them
+    """
+
+    def __init__(self, client: redis.Redis):
+        self.client = client
+        self.instance_id = uuid.uuid4().hex
+        self.lease_key = os.getenv("MAINTENANCE_LEASE_KEY", "maintenance:leader")
+        self.stats_key = f"{self.lease_key}:jobs"
+        self.lease_ttl = int(os.getenv("MAINTENANCE_LEASE_TTL", "30"))
+        self.tick = float(os.getenv("MAINTENANCE_TICK", "10"))
+        self.batch_size = int(os.getenv("MAINTENANCE_BATCH_SIZE", "500"))
+        self.batch_pause = float(os.getenv("MAINTENANCE_BATCH_PAUSE_MS", "50")) / 1000
+
+        self.jobs: Dict[str, MaintenanceJob] = {}
+        self.is_leader = False
+
+        self._renew = client.register_script(_RENEW_LEASE)
+        self._release = client.register_script(_RELEASE_LEASE)
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, interval: float, run: JobRun, batch_size: Optional[int] = None):
+        """Register a job run at most once every `interval` seconds"""
+        self.jobs[name] = MaintenanceJob(name, interval, run, batch_size or self.batch_size)
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        while True:
+            try:
+                if await self._hold_lease():
+                    await self._load_last_runs()
+                    for job in list(self.jobs.values()):
+                        if time.time() - job.last_finished >= job.interval:
+                            await self.run_job(job.name)
+                        if not self.is_leader:
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Maintenance scheduler error: {str(e)}")
+            await asyncio.sleep(self.tick)
+
+    async def _hold_lease(self) -> bool:
+        """Acquire or renew leadership"""
+        if self.is_leader:
+            self.is_leader = bool(await self._renew(
+                keys=[self.lease_key], args=[self.instance_id, self.lease_ttl]
+            ))
+        if not self.is_leader:
+            self.is_leader = bool(await self.client.set(
+                self.lease_key, self.instance_id, nx=True, ex=self.lease_ttl
+            ))
+            if self.is_leader:
+                logger.info(f"Maintenance leadership acquired by {self.instance_id}")
+        return self.is_leader
+
+    async def _heartbeat(self, worker: asyncio.Task, lost: asyncio.Event):
+        """Renew the lease every third of its TTL; cancel the job once it is lost"""
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            try:
+                renewed = await self._renew(
+                    keys=[self.lease_key], args=[self.instance_id, self.lease_ttl]
+                )
+            except Exception as e:
+                # Unconfirmed is as good as lost: the lease may expire meanwhile
+                logger.error(f"Maintenance lease renewal failed: {str(e)}")
+                renewed = 0
+            if not renewed:
+                self.is_leader = False
+                lost.set()
+                worker.cancel()
+                return
+
+    async def _load_last_runs(self):
+        """Pick up finish times recorded by previous leaders"""
+        recorded = await self.client.hgetall(self.stats_key)
+        for name, data in recorded.items():
+            job = self.jobs.get(name)
+            if job is not None:
+                job.last_finished = max(job.last_finished, json.loads(data).get("last_finished", 0.0))
+
+    async def run_job(self, name: str) -> Dict[str, Any]:
+        """Run one job to completion (or until leadership is lost)"""
+        job = self.jobs[name]
+        start = time.perf_counter()
+        rows = 0
+        batches = 0
+        job.last_error = None
+
+        run = job.run(job.batch_size)
+
+        async def consume():
+            nonlocal rows, batches
+            async for affected in run:
+                rows += affected
+                batches += 1
+                await asyncio.sleep(self.batch_pause)
+
+        # Batches can outlast the lease TTL, so it is renewed alongside them
+        lost = asyncio.Event()
+        worker = asyncio.create_task(consume())
+        heartbeat = asyncio.create_task(self._heartbeat(worker, lost))
+        try:
+            await worker
+        except asyncio.CancelledError:
+            if not lost.is_set():
+                raise
+            logger.warning(f"Maintenance lease lost during {name}, cancelled")
+        except Exception as e:
+            job.last_error = str(e)
+            logger.error(f"Maintenance job {name} failed: {str(e)}")
+        finally:
+            heartbeat.cancel()
+            if not worker.done():
+                worker.cancel()
+                await asyncio.wait([worker])
+            await run.aclose()
+
+        job.runs += 1
+        job.last_finished = time.time()
+        job.last_duration_ms = round((time.perf_counter() - start) * 1000, 3)
+        job.last_rows = rows
+        job.last_batches = batches
+        job.total_rows += rows
+
+        logger.info(
+            f"Maintenance job {name}: {rows} rows in {batches} batches, "
+            f"{job.last_duration_ms}ms"
+        )
+        try:
+            await self.client.hset(self.stats_key, name, json.dumps(job.stats()))
+        except Exception as e:
+            logger.warning(f"Could not record maintenance stats for {name}: {str(e)}")
+
+        return job.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "instance_id": self.instance_id,
+            "leader": self.is_leader,
+            "jobs": {name: job.stats() for name, job in self.jobs.items()}
+        }
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        if self.is_leader:
+            try:
+                await self._release(keys=[self.lease_key], args=[self.instance_id])
+            except Exception:
+                pass  # Expires on its own
+            self.is_leader = False
+
+
+async def vacuum_tables(pg_pool, tables: List[str], min_dead_tuples: int) -> AsyncIterator[int]:
+    """
+    Vacuum-style job: VACUUM (ANALYZE) each table with enough dead tuples,
+    one table per batch; yields the dead tuples reported before each vacuum
+    `tables` are LIKE patterns, so "messages%" covers every partition
+    """
+    async with pg_pool.acquire() as conn:
+        rows = await conn.fetch("""
+            SELECT relname, n_dead_tup FROM pg_stat_user_tables
+            WHERE relname LIKE ANY($1::text[]) AND n_dead_tup >= $2
+            ORDER BY n_dead_tup DESC
+        """, tables, min_dead_tuples)
+
+    for row in rows:
+        async with pg_pool.acquire() as conn:
+            # Table names come from the fixed list above, never user input
+            await conn.execute(f'VACUUM (ANALYZE) "{row["relname"]}"')
+        yield row['n_dead_tup']
@@ -3,11 +3,15 @@ MCP Protocol Handler with Context Injection
 Intercepts MCP requests to other AIs and injects their project-specific context
 """
 
+import os
 import json
 import re
+from functools import lru_cache
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 
+from core.idempotency import IdempotencyStore, idempotency_key
+from core.injection_cache import InjectionCache
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -61,28 +65,81 @@ class MCPProtocolHandler:
             "context": r"^/context\s*(.*)$",
             "history": r"^/history\s*(.*)$"
         }
+        
+        # Methods answered directly, without detection or context injection
+        self.method_handlers = {
+            "initialize": self._handle_initialize,
+            "tools/list": lambda params: self._handle_tools_list(),
+            "notifications/list": lambda params: self._handle_notifications_list()
+        }
+        
+        # Rendered injection payloads per session, AI and format
+        self.injection_cache = InjectionCache()
+        
+        # Results of completed tool calls, for client retries
+        self.idempotency = IdempotencyStore()
+        
+        self._compile_routes()
+    
+    def _compile_routes(self):
+        """
+        Compile the pattern tables above into single regexes
+        - AIs: one anchored alternation of lookaheads, tried in ai_patterns
+          order, so the first AI with any matching pattern wins as before
+        - Tools: one alternation of the escaped substrings
+        - Commands: the names share a single "^/(name)" prefix match
+        Method names come from a small set, so results are memoized per name
+        """
+        ai_branches = [
+            f"(?=.*?(?:{'|'.join(patterns)}))(?P<{ai_name}>)"
+            for ai_name, patterns in self.ai_patterns.items()
+        ]
+        self._ai_regex = re.compile(f"^(?:{'|'.join(ai_branches)})", re.IGNORECASE | re.DOTALL)
+        
+        self._tool_regex = re.compile("|".join(map(re.escape, self.context_aware_tools)))
+        
+        # Each command pattern is "^/<name>\s*(.*)$"
+        self._command_regex = re.compile(
+            rf"^/(?P<command>{'|'.join(map(re.escape, self.command_patterns))})\s*(.*)$",
+            re.IGNORECASE
+        )
+        
+        cache_size = int(os.getenv("MCP_ROUTE_CACHE_SIZE", "1024"))
+        self._detect_ai = lru_cache(maxsize=cache_size)(self._match_ai)
+        self._tool_matcher = lru_cache(maxsize=cache_size)(self._match_tool)
+    
+    def _match_ai(self, method: str) -> Optional[str]:
+        match = self._ai_regex.match(method)
+        return match.lastgroup if match else None
+    
+    def _match_tool(self, method: str) -> bool:
+        return self._tool_regex.search(method.lower()) is not None
     
     def detect_ai_from_method(self, method: str) -> Optional[str]:
         """Detect which AI is being called from the method name"""
-        for ai_name, patterns in self.ai_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, method, re.IGNORECASE):
-                    return ai_name
-        return None
+        return self._detect_ai(method)
     
     def should_inject_context(self, method: str) -> bool:
         """Determine if this method should have context injected"""
-        method_lower = method.lower()
-        return any(tool in method_lower for tool in self.context_aware_tools)
+        return self._tool_matcher(method)
     
     def detect_command(self, content: str) -> Optional[Tuple[str, str]]:
         """Detect if content contains a command like /clear"""
-        for cmd_name, pattern in self.command_patterns.items():
-            match = re.match(pattern, content.strip(), re.IGNORECASE)
-            if match:
-                return (cmd_name, match.group(1) if match.groups() else "")
+        content = content.strip()
+        if not content.startswith("/"):
+            return None
+        match = self._command_regex.match(content)
+        if match:
+            return (match.group("command").lower(), match.group(2))
         return None
     
+    def routing_stats(self) -> Dict[str, Any]:
+        """Hit rates of the per-method memo caches"""
+        return {
+            "detect_ai": self._detect_ai.cache_info()._asdict(),
+            "inject_context": self._tool_matcher.cache_info()._asdict()
+        }
+    
     async def handle_request(
         self,
         method: str,
@@ -91,25 +148,23 @@ class MCPProtocolHandler:
         context_manager,
         session_manager,
         debug_service,
-        analysis_service
+        analysis_service,
+        client_id: Optional[str] = None
     ) -> Any:
         """
         Handle incoming MCP request
         Injects context when calling other AIs
+        client_id identifies the connection (stdio process, HTTP
+        Mcp-Session-Id) for deduplicating retried tool calls
         """
         try:
-            # Get current project path (from params or environment)
-            project_path = params.get("project_path") or os.getcwd()
-            
             # Handle special methods
-            if method == "initialize":
-                return await self._handle_initialize(params)
+            handler = self.method_handlers.get(method)
+            if handler is not None:
+                return await handler(params)
             
-            elif method == "tools/list":
-                return await self._handle_tools_list()
-            
-            elif method == "notifications/list":
-                return await self._handle_notifications_list()
+            # Get current project path (from params or environment)
+            project_path = params.get("project_path") or os.getcwd()
             
             # Check for commands in the content
             if "prompt" in params or "content" in params:
@@ -124,55 +179,98 @@ class MCPProtocolHandler:
                             cmd_args, project_path, session_manager, context_manager
                         )
             
-            # Detect which AI is being called
-            ai_name = self.detect_ai_from_method(method)
+            # A retried tool call is answered from the idempotency store,
+            # without a second provider call or history write
+            if self._has_side_effects(method, params):
+                key = idempotency_key(params, request_id, scope=project_path, client_id=client_id)
+                return await self.idempotency.run(key, lambda: self._process_request(
+                    method, params, project_path, context_manager, session_manager,
+                    debug_service, analysis_service
+                ))
             
-            if ai_name and self.should_inject_context(method):
-                # Get or create session for this AI and project
-                session = await session_manager.get_or_create_session(
-                    ai_name, project_path
-                )
-                
-                if session:
-                    # Get context for this AI
-                    context = await context_manager.get_context(session.session_id)
-                    
-                    if context and context.messages:
-                        # Inject context into the request
-                        params = await self._inject_context(
-                            params, context, ai_name, method
-                        )
-                        
-                        logger.info(f"Injected context for {ai_name}: {len(context.messages)} messages")
+            return await self._process_request(
+                method, params, project_path, context_manager, session_manager,
+                debug_service, analysis_service
+            )
             
-            # Handle the actual tool call
-            if method.startswith("tools/call"):
-                tool_name = params.get("name", "")
-                tool_params = params.get("arguments", {})
-                
-                # Route to appropriate service
-                if "debug" in tool_name:
-                    result = await debug_service.handle_tool_call(tool_name, tool_params)
-                elif "analyze" in tool_name or "review" in tool_name:
-                    result = await analysis_service.handle_tool_call(tool_name, tool_params)
-                else:
-                    # Default handling - pass through to the actual AI
-                    result = await self._call_external_ai(ai_name, method, params)
+        except Exception as e:
+            logger.error(f"MCP request error: {str(e)}")
+            raise
+    
+    def _has_side_effects(self, method: str, params: Dict[str, Any]) -> bool:
+        """Tool calls that reach an AI provider or append to its history"""
+        if not method.startswith("tools/call"):
+            return False
+        ai_name = self.detect_ai_from_method(method)
+        if ai_name is None:
+            return False
+        if self.should_inject_context(method):
+            return True
+        # Same routing as _process_request: service tools stay local
+        tool_name = params.get("name", "")
+        return not ("debug" in tool_name or "analyze" in tool_name or "review" in tool_name)
+    
+    async def _process_request(
+        self,
+        method: str,
+        params: Dict[str, Any],
+        project_path: str,
+        context_manager,
+        session_manager,
+        debug_service,
+        analysis_service
+    ) -> Any:
+        """Inject context, run the call and store the exchange"""
+        # The prompt as sent, before any context is injected into params
+        original_prompt = params.get("prompt") or params.get("content", "")
+        
+        # Detect which AI is being called
+        ai_name = self.detect_ai_from_method(method)
+        session = None
+        
+        if ai_name and self.should_inject_context(method):
+            # Get or create session for this AI and project
+            session = await session_manager.get_or_create_session(
+                ai_name, project_path
+            )
+            
+            if session:
+                # Get context for this AI
+                context = await context_manager.get_context(session.session_id)
                 
-                # Store the response in context
-                if ai_name and session:
-                    await self._store_ai_response(
-                        context_manager, session.session_id, ai_name, params, result
+                if context and context.messages:
+                    # Inject context into the request
+                    params = await self._inject_context(
+                        params, context, ai_name, method
                     )
-                
-                return result
+                    
+                    logger.info(f"Injected context for {ai_name}: {len(context.messages)} messages")
+        
+        # Handle the actual tool call
+        if method.startswith("tools/call"):
+            tool_name = params.get("name", "")
+            tool_params = params.get("arguments", {})
             
-            # Default response for unhandled methods
-            return {"status": "ok"}
+            # Route to appropriate service
+            if "debug" in tool_name:
+                result = await debug_service.handle_tool_call(tool_name, tool_params)
+            elif "analyze" in tool_name or "review" in tool_name:
+                result = await analysis_service.handle_tool_call(tool_name, tool_params)
+            else:
+                # Default handling - pass through to the actual AI
+                result = await self._call_external_ai(ai_name, method, params)
             
-        except Exception as e:
-            logger.error(f"MCP request error: {str(e)}")
-            raise
+            # Store the response in context
+            if ai_name and session:
+                await self._store_ai_response(
+                    context_manager, session.session_id, ai_name, method,
+                    original_prompt, result
+                )
+            
+            return result
+        
+        # Default response for unhandled methods
+        return {"status": "ok"}
     
     async def _inject_context(
         self,
@@ -219,6 +317,14 @@ class MCPProtocolHandler:
         if not context.messages:
             return ""
         
+        # Last 10 messages, rendered once and extended as messages arrive
+        return self.injection_cache.get(
+            context, ai_name, "summary", 10,
+            self._summary_frame, self._summary_line, self._assemble_summary
+        )
+    
+    def _summary_frame(self, context, ai_name: str) -> Tuple[str, str]:
+        """Text around the recent conversation in a context summary"""
         summary_parts = [
             f"[Previous context for {ai_name.upper()}]",
             f"You have been working on this project before. Here's what you should remember:"
@@ -232,29 +338,48 @@ class MCPProtocolHandler:
             if "current_files" in context.project_context:
                 summary_parts.append(f"Files you've worked with: {', '.join(context.project_context['current_files'][:5])}")
         
-        # Add recent conversation summary
-        recent_messages = context.messages[-10:]  # Last 10 messages
-        if recent_messages:
-            summary_parts.append("\nRecent conversation:")
-            for msg in recent_messages:
-                role = "You" if msg.role == "assistant" else "User"
-                # Truncate long messages
-                content = msg.content[:200] + "..." if len(msg.content) > 200 else msg.content
-                summary_parts.append(f"{role}: {content}")
+        # Add the running summary of compacted history
+        summary = getattr(context, "summary", None)
+        if summary and summary.get("content"):
+            summary_parts.append(
+                f"\nEarlier conversation (summary v{summary['version']} "
+                f"of {summary['message_count']} messages):"
+            )
+            summary_parts.append(summary["content"])
+        
+        summary_parts.append("\nRecent conversation:")
+        
+        tail_parts = []
         
         # Add any active debugging or analysis state
         if context.metadata.get("active_debug_session"):
-            summary_parts.append(f"\nActive debugging session: {context.metadata['active_debug_session']}")
+            tail_parts.append(f"\nActive debugging session: {context.metadata['active_debug_session']}")
         
-        summary_parts.append("\n[End of previous context]")
+        tail_parts.append("\n[End of previous context]")
         
-        return "\n".join(summary_parts)
+        return "\n".join(summary_parts), "\n".join(tail_parts)
+    
+    @staticmethod
+    def _summary_line(msg) -> str:
+        role = "You" if msg.role == "assistant" else "User"
+        # Truncate long messages
+        content = msg.content[:200] + "..." if len(msg.content) > 200 else msg.content
+        return f"{role}: {content}"
+    
+    @staticmethod
+    def _assemble_summary(head: str, lines, tail: str) -> str:
+        return "\n".join((head, *lines, tail))
     
     def _convert_to_chat_messages(self, context, ai_name: str) -> List[Dict[str, str]]:
         """Convert context to chat message format"""
-        messages = []
-        
-        # Add system message with context
+        # Last 20 messages, rendered once and extended as messages arrive
+        return self.injection_cache.get(
+            context, ai_name, "chat", 20,
+            self._chat_frame, self._chat_message, self._assemble_chat
+        )
+    
+    def _chat_frame(self, context, ai_name: str) -> Tuple[Dict[str, str], None]:
+        """System message with context"""
         system_msg = {
             "role": "system",
             "content": f"You are {ai_name.upper()} assisting with a software project. "
@@ -265,62 +390,55 @@ class MCPProtocolHandler:
             system_msg["content"] += f"\n\nProject: {context.project_context.get('name', 'Unknown')}"
             system_msg["content"] += f"\nPath: {context.project_context.get('path', 'Unknown')}"
         
-        messages.append(system_msg)
+        summary = getattr(context, "summary", None)
+        if summary and summary.get("content"):
+            system_msg["content"] += f"\n\nSummary of earlier conversation:\n{summary['content']}"
         
-        # Add recent conversation messages
-        for msg in context.messages[-20:]:  # Last 20 messages
-            messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
-        
-        return messages
+        return system_msg, None
+    
+    @staticmethod
+    def _chat_message(msg) -> Dict[str, str]:
+        return {
+            "role": msg.role,
+            "content": msg.content
+        }
+    
+    @staticmethod
+    def _assemble_chat(system_msg: Dict[str, str], messages, tail) -> List[Dict[str, str]]:
+        # Cached and shared: _inject_context concatenates into a new list
+        return [system_msg, *messages]
     
     async def _store_ai_response(
         self,
         context_manager,
         session_id: str,
         ai_name: str,
-        request: Dict[str, Any],
+        method: str,
+        prompt: str,
         response: Any
     ):
-        """Store AI request and response in context"""
-        # Extract the actual prompt/content
-        user_content = request.get("prompt") or request.get("content", "")
-        
-        # Remove our injected context to get original request
-        if "[Previous context for" in user_content:
-            parts = user_content.split("[End of previous context]")
-            if len(parts) > 1:
-                user_content = parts[1].strip()
-                if user_content.startswith("Current request:"):
-                    user_content = user_content[len("Current request:"):].strip()
-        
-        # Store user message
-        await context_manager.add_message(
+        """
+        Store AI request and response in context as one exchange
+        `prompt` is the original request, captured before context injection
+        """
+        timestamp = datetime.utcnow().isoformat()
+        response_content = self._extract_response_content(response)
+        
+        await context_manager.append_exchange(
             session_id=session_id,
-            role="user",
-            content=user_content,
-            metadata={
+            user_content=prompt,
+            assistant_content=response_content or None,
+            user_metadata={
+                "ai_name": ai_name,
+                "method": method,
+                "timestamp": timestamp
+            },
+            assistant_metadata={
                 "ai_name": ai_name,
-                "method": request.get("_method", "unknown"),
-                "timestamp": datetime.utcnow().isoformat()
+                "response_type": type(response).__name__,
+                "timestamp": timestamp
             }
         )
-        
-        # Store AI response
-        response_content = self._extract_response_content(response)
-        if response_content:
-            await context_manager.add_message(
-                session_id=session_id,
-                role="assistant",
-                content=response_content,
-                metadata={
-                    "ai_name": ai_name,
-                    "response_type": type(response).__name__,
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-            )
     
     def _extract_response_content(self, response: Any) -> str:
         """Extract text content from various response formats"""
@@ -367,9 +485,7 @@ class MCPProtocolHandler:
             else:
                 message = f"Unknown AI: {args}. Use /clear all or /clear [gemini|grok|openai|deepseek]"
         
-        # Broadcast clear event
-        await session_manager.broadcast_clear_event(project_path, "user_command")
-        
+        # Connected clients on every instance are told by the session manager
         return {"status": "ok", "message": message}
     
     async def _handle_initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -479,7 +595,7 @@ class MCPProtocolHandler:
             context = await context_manager.get_context(session_id)
             return {
                 "type": "context_response",
-                "context": context.dict() if context else None
+                "context": context.to_dict() if context else None
             }
         
         else:
@@ -487,6 +603,3 @@ class MCPProtocolHandler:
                 "type": "error",
                 "message": f"Unknown message type: {msg_type}"
             }
-
-
-import os  # Add this import at the top
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Project statistics
+Per-project and global counters (messages, tokens, bytes, sessions, clears)
+maintained by triggers at write time, so status and info reads are O(1)
+instead of scanning history
+"""
+
+from typing import Any, Dict, Optional
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# project_id of the row holding totals across all projects
+GLOBAL_SCOPE = "*"
+
+# Each counter row is split into shards picked by backend, so concurrent
+# writers to one project (or to the global row) rarely wait on each other
+STATS_SHARDS = 8
+
+# Serializes installation across instances starting together
+_INSTALL_LOCK = 7_402_116_001
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS project_stats (
+        project_id TEXT NOT NULL,
+        shard SMALLINT NOT NULL,
+        messages BIGINT NOT NULL DEFAULT 0,
+        tokens BIGINT NOT NULL DEFAULT 0,
+        bytes BIGINT NOT NULL DEFAULT 0,
+        sessions BIGINT NOT NULL DEFAULT 0,
+        active_sessions BIGINT NOT NULL DEFAULT 0,
+        clears BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (project_id, shard)
+    )
+    """,
+    # Whitespace token estimate, as in len(content.split())
+    """
+    CREATE OR REPLACE FUNCTION project_stats_tokens(content TEXT) RETURNS BIGINT AS $$
+        SELECT CASE WHEN btrim(content) = '' THEN 0
+                    ELSE array_length(regexp_split_to_array(btrim(content), '\\s+'), 1)
+               END
+    $$ LANGUAGE sql IMMUTABLE
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION project_stats_add(
+        p_project TEXT, d_messages BIGINT, d_tokens BIGINT, d_bytes BIGINT,
+        d_sessions BIGINT, d_active BIGINT, d_clears BIGINT
+    ) RETURNS void AS $$
+        INSERT INTO project_stats AS s
+            (project_id, shard, messages, tokens, bytes, sessions, active_sessions, clears)
+        SELECT scope, pg_backend_pid() % {STATS_SHARDS},
+               d_messages, d_tokens, d_bytes, d_sessions, d_active, d_clears
+        FROM unnest(ARRAY['{GLOBAL_SCOPE}', p_project]) AS scope
+        WHERE scope IS NOT NULL
+        ON CONFLICT (project_id, shard) DO UPDATE SET
+            messages = s.messages + EXCLUDED.messages,
+            tokens = s.tokens + EXCLUDED.tokens,
+            bytes = s.bytes + EXCLUDED.bytes,
+            sessions = s.sessions + EXCLUDED.sessions,
+            active_sessions = s.active_sessions + EXCLUDED.active_sessions,
+            clears = s.clears + EXCLUDED.clears
+    $$ LANGUAGE sql
+    """,
+    # Messages: statement-level, aggregated per project. A message belongs to
+    # the project of its live session, or of the cleared session it was
+    # written under; messages of unknown sessions only count globally.
+    """
+    CREATE OR REPLACE FUNCTION project_stats_messages() RETURNS trigger AS $$
+    DECLARE
+        sign BIGINT := CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END;
+        r RECORD;
+    BEGIN
+        FOR r IN
+            SELECT COALESCE(a.project_id, cs.project_id) AS project_id,
+                   count(*) AS messages,
+                   sum(project_stats_tokens(m.content)) AS tokens,
+                   sum(octet_length(m.content)) AS bytes
+            FROM changed_rows m
+            LEFT JOIN ai_sessions a ON a.session_id = m.session_id::text
+            LEFT JOIN cleared_sessions cs ON cs.session_id = m.session_id::text
+            GROUP BY 1
+        LOOP
+            PERFORM project_stats_add(
+                r.project_id, sign * r.messages, sign * r.tokens, sign * r.bytes, 0, 0, 0
+            );
+        END LOOP;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER project_stats_messages_insert
+    AFTER INSERT ON messages REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION project_stats_messages()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER project_stats_messages_delete
+    AFTER DELETE ON messages REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION project_stats_messages()
+    """,
+    # Sessions: every new session id counts once; active_sessions follows
+    # the cleared flag
+    """
+    CREATE OR REPLACE FUNCTION project_stats_sessions() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM project_stats_add(
+                NEW.project_id, 0, 0, 0, 1, CASE WHEN NEW.cleared THEN 0 ELSE 1 END, 0
+            );
+        ELSIF TG_OP = 'UPDATE' THEN
+            PERFORM project_stats_add(
+                NEW.project_id, 0, 0, 0,
+                CASE WHEN NEW.session_id IS DISTINCT FROM OLD.session_id THEN 1 ELSE 0 END,
+                (CASE WHEN NEW.cleared THEN 0 ELSE 1 END) - (CASE WHEN OLD.cleared THEN 0 ELSE 1 END),
+                0
+            );
+        ELSE
+            PERFORM project_stats_add(
+                OLD.project_id, 0, 0, 0, 0, CASE WHEN OLD.cleared THEN 0 ELSE -1 END, 0
+            );
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER project_stats_sessions
+    AFTER INSERT OR DELETE OR UPDATE OF session_id, cleared ON ai_sessions
+    FOR EACH ROW EXECUTE FUNCTION project_stats_sessions()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION project_stats_clears() RETURNS trigger AS $$
+    DECLARE
+        r RECORD;
+    BEGIN
+        FOR r IN SELECT project_id, count(*) AS clears FROM changed_rows GROUP BY 1 LOOP
+            PERFORM project_stats_add(r.project_id, 0, 0, 0, 0, 0, r.clears);
+        END LOOP;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER project_stats_clears
+    AFTER INSERT ON clear_events REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION project_stats_clears()
+    """,
+    # Dropping a partition bypasses delete triggers; subtract it explicitly
+    """
+    CREATE OR REPLACE FUNCTION project_stats_forget_partition(part regclass) RETURNS void AS $$
+    DECLARE
+        r RECORD;
+    BEGIN
+        FOR r IN EXECUTE format($q$
+            SELECT COALESCE(a.project_id, cs.project_id) AS project_id,
+                   count(*) AS messages,
+                   sum(project_stats_tokens(m.content)) AS tokens,
+                   sum(octet_length(m.content)) AS bytes
+            FROM %s m
+            LEFT JOIN ai_sessions a ON a.session_id = m.session_id::text
+            LEFT JOIN cleared_sessions cs ON cs.session_id = m.session_id::text
+            GROUP BY 1
+        $q$, part)
+        LOOP
+            PERFORM project_stats_add(r.project_id, -r.messages, -r.tokens, -r.bytes, 0, 0, 0);
+        END LOOP;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+]
+
+# Counters for data written before the triggers existed (run once, shard 0)
+BACKFILL = f"""
+    WITH message_totals AS (
+        SELECT COALESCE(a.project_id, cs.project_id) AS project_id,
+               count(*) AS messages,
+               sum(project_stats_tokens(m.content)) AS tokens,
+               sum(octet_length(m.content)) AS bytes
+        FROM messages m
+        LEFT JOIN ai_sessions a ON a.session_id = m.session_id::text
+        LEFT JOIN cleared_sessions cs ON cs.session_id = m.session_id::text
+        GROUP BY 1
+    ),
+    session_totals AS (
+        SELECT project_id, count(*) AS sessions,
+               count(*) FILTER (WHERE NOT cleared) AS active_sessions
+        FROM ai_sessions GROUP BY 1
+    ),
+    clear_totals AS (
+        SELECT project_id, count(*) AS clears FROM clear_events GROUP BY 1
+    ),
+    per_project AS (
+        SELECT project_id,
+               COALESCE(m.messages, 0) AS messages, COALESCE(m.tokens, 0) AS tokens,
+               COALESCE(m.bytes, 0) AS bytes, COALESCE(s.sessions, 0) AS sessions,
+               COALESCE(s.active_sessions, 0) AS active_sessions, COALESCE(c.clears, 0) AS clears
+        FROM message_totals m
+        FULL JOIN session_totals s USING (project_id)
+        FULL JOIN clear_totals c USING (project_id)
+    )
+    INSERT INTO project_stats
+        (project_id, shard, messages, tokens, bytes, sessions, active_sessions, clears)
+    SELECT project_id, 0, messages, tokens, bytes, sessions, active_sessions, clears
+    FROM per_project WHERE project_id IS NOT NULL
+    UNION ALL
+    SELECT '{GLOBAL_SCOPE}', 0, sum(messages), sum(tokens), sum(bytes),
+           sum(sessions), sum(active_sessions), sum(clears)
+    FROM per_project
+"""
+
+READ = """
+    SELECT
+        COALESCE(sum(messages), 0) AS messages,
+        COALESCE(sum(tokens), 0) AS tokens,
+        COALESCE(sum(bytes), 0) AS bytes,
+        COALESCE(sum(sessions), 0) AS sessions,
+        COALESCE(sum(active_sessions), 0) AS active_sessions,
+        COALESCE(sum(clears), 0) AS clears
+    FROM project_stats
+    WHERE project_id = $1
+"""
+
+
+async def install(conn):
+    """
+    Create the stats table, functions and triggers, backfilling counters
+    from existing history the first time
+    Requires the session tables (ai_sessions, cleared_sessions,
+    clear_events) and the messages table to exist
+    """
+    if not await conn.fetchval("SELECT to_regclass('messages') IS NOT NULL"):
+        logger.warning("messages table missing; project statistics not installed")
+        return
+
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", _INSTALL_LOCK)
+
+        fresh = await conn.fetchval("SELECT to_regclass('project_stats') IS NULL")
+        for statement in SCHEMA:
+            await conn.execute(statement)
+
+        if fresh:
+            await conn.execute(BACKFILL)
+            logger.info("Project statistics backfilled from existing history")
+
+
+async def read(conn, project_id: Optional[str] = None) -> Dict[str, Any]:
+    """Counters for one project, or global totals when project_id is None"""
+    row = await conn.fetchrow(READ, project_id or GLOBAL_SCOPE)
+    return dict(row)
+
+
+async def forget_partition(conn, partition: str):
+    """Subtract a messages partition that is about to be dropped"""
+    await conn.execute("SELECT project_stats_forget_partition($1::regclass)", partition)
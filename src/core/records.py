@@ -0,0 +1,205 @@
+"""
+Compact internal representation of conversation contexts
+Slotted records used on the cache and injection hot paths; pydantic models
+from core.context_manager are only built at external boundaries
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _parse_timestamp(value: Union[str, datetime, None]) -> Optional[datetime]:
+    """Parse an ISO timestamp (datetimes pass through)"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _format_timestamp(value: Union[str, datetime, None]) -> Optional[str]:
+    """Format a timestamp as ISO (strings pass through untouched)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class MessageRecord:
+    """
+    A single message
+    The timestamp is kept in whatever form it arrived in (ISO string from the
+    cache, datetime from Postgres) and only parsed when actually read
+    """
+    __slots__ = ("id", "role", "content", "_timestamp", "metadata")
+
+    def __init__(
+        self,
+        id: str,
+        role: str,
+        content: str,
+        timestamp: Union[str, datetime],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.id = id
+        self.role = role
+        self.content = content
+        self._timestamp = timestamp
+        self.metadata = metadata if metadata is not None else {}
+
+    @property
+    def timestamp(self) -> datetime:
+        value = self._timestamp
+        if not isinstance(value, datetime):
+            value = self._timestamp = _parse_timestamp(value)
+        return value
+
+    @timestamp.setter
+    def timestamp(self, value: Union[str, datetime]):
+        self._timestamp = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "role": self.role,
+            "content": self.content,
+            "timestamp": _format_timestamp(self._timestamp),
+            "metadata": self.metadata
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MessageRecord":
+        return cls(
+            data["id"],
+            data["role"],
+            data["content"],
+            data["timestamp"],
+            data.get("metadata")
+        )
+
+    def to_model(self):
+        """Validated pydantic Message, for external boundaries"""
+        from core.context_manager import Message
+        return Message(**self.to_dict())
+
+    @classmethod
+    def from_model(cls, message) -> "MessageRecord":
+        return cls(
+            message.id,
+            message.role,
+            message.content,
+            message.timestamp,
+            dict(message.metadata or {})
+        )
+
+
+class ContextRecord:
+    """A conversation context: messages plus session-level state"""
+    __slots__ = (
+        "session_id", "user_id", "messages", "metadata", "_created_at",
+        "_updated_at", "project_context", "summary"
+    )
+
+    def __init__(
+        self,
+        session_id: str,
+        created_at: Union[str, datetime],
+        updated_at: Union[str, datetime],
+        user_id: Optional[str] = None,
+        messages: Optional[List[MessageRecord]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        project_context: Optional[Dict[str, Any]] = None,
+        summary: Optional[Dict[str, Any]] = None
+    ):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.messages = messages if messages is not None else []
+        self.metadata = metadata if metadata is not None else {}
+        self._created_at = created_at
+        self._updated_at = updated_at
+        self.project_context = project_context
+        self.summary = summary
+
+    @property
+    def created_at(self) -> datetime:
+        value = self._created_at
+        if not isinstance(value, datetime):
+            value = self._created_at = _parse_timestamp(value)
+        return value
+
+    @created_at.setter
+    def created_at(self, value: Union[str, datetime]):
+        self._created_at = value
+
+    @property
+    def updated_at(self) -> datetime:
+        value = self._updated_at
+        if not isinstance(value, datetime):
+            value = self._updated_at = _parse_timestamp(value)
+        return value
+
+    @updated_at.setter
+    def updated_at(self, value: Union[str, datetime]):
+        self._updated_at = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "messages": [m.to_dict() for m in self.messages],
+            "metadata": self.metadata,
+            "created_at": _format_timestamp(self._created_at),
+            "updated_at": _format_timestamp(self._updated_at),
+            "project_context": self.project_context,
+            "summary": self.summary
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ContextRecord":
+        from_message = MessageRecord.from_dict
+        return cls(
+            data["session_id"],
+            data["created_at"],
+            data["updated_at"],
+            user_id=data.get("user_id"),
+            messages=[from_message(m) for m in data.get("messages") or ()],
+            metadata=data.get("metadata"),
+            project_context=data.get("project_context"),
+            summary=data.get("summary")
+        )
+
+    def to_model(self):
+        """Validated pydantic ConversationContext, for external boundaries"""
+        from core.context_manager import ConversationContext
+        return ConversationContext(**self.to_dict())
+
+    @classmethod
+    def from_model(cls, context) -> "ContextRecord":
+        return cls(
+            context.session_id,
+            context.created_at,
+            context.updated_at,
+            user_id=context.user_id,
+            messages=[MessageRecord.from_model(m) for m in context.messages],
+            metadata=dict(context.metadata or {}),
+            project_context=context.project_context,
+            summary=context.summary
+        )
+
+
+def encode_context(context: ContextRecord) -> Union[bytes, str]:
+    """Serialize a context for the cache"""
+    data = context.to_dict()
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=str)
+
+
+def decode_context(data: Union[bytes, str]) -> ContextRecord:
+    """Deserialize a cached context without model validation"""
+    if orjson is not None:
+        return ContextRecord.from_dict(orjson.loads(data))
+    return ContextRecord.from_dict(json.loads(data))
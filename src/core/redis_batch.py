@@ -0,0 +1,113 @@
+"""
+Redis command batching
+Pipelines multi-command operations atomically and coalesces concurrent
+independent commands into a single pipeline flush
+"""
+
+import os
+import asyncio
+from typing import Any, List, Optional, Sequence, Tuple
+
+import redis.asyncio as redis
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# (command name, args) as accepted by redis-py, e.g. ("setex", (key, ttl, value))
+Command = Tuple[str, Sequence[Any]]
+
+
+class RedisBatcher:
+    """
+    Batching layer over an asyncio Redis client
+    - atomic(): several commands in one MULTI/EXEC round trip
+    - submit(): independent commands issued within `window_ms` of each other
+      are sent together in one non-transactional pipeline
+    """
+
+    def __init__(self, client: redis.Redis):
+        self.client = client
+        self.window = float(os.getenv("REDIS_BATCH_WINDOW_MS", "2")) / 1000
+        self.max_batch = int(os.getenv("REDIS_BATCH_MAX", "128"))
+
+        self._pending: List[Tuple[str, Sequence[Any], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self.flushes = 0
+        self.commands = 0
+
+    async def atomic(self, commands: Sequence[Command]) -> List[Any]:
+        """Run commands as one MULTI/EXEC transaction in a single round trip"""
+        async with self.client.pipeline(transaction=True) as pipe:
+            for name, args in commands:
+                getattr(pipe, name)(*args)
+            return await pipe.execute()
+
+    async def submit(self, name: str, *args) -> Any:
+        """Queue one command for the next coalesced flush and await its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((name, args, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._schedule_flush(immediate=True)
+        elif self._flush_handle is None:
+            self._schedule_flush()
+
+        return await future
+
+    def _schedule_flush(self, immediate: bool = False):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        loop = asyncio.get_running_loop()
+        if immediate:
+            loop.create_task(self._flush())
+        else:
+            self._flush_handle = loop.call_later(
+                self.window, lambda: loop.create_task(self._flush())
+            )
+
+    async def _flush(self):
+        """Send every queued command in one pipeline"""
+        self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for name, args, _ in batch:
+                    getattr(pipe, name)(*args)
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.flushes += 1
+        self.commands += len(batch)
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def get(self, key: str) -> Any:
+        return await self.submit("get", key)
+
+    async def setex(self, key: str, ttl: int, value: Any) -> Any:
+        return await self.submit("setex", key, ttl, value)
+
+    async def delete(self, *keys: str) -> int:
+        return await self.submit("delete", *keys) if keys else 0
+
+    async def unlink(self, *keys: str) -> int:
+        """Non-blocking delete: memory is reclaimed in the background"""
+        return await self.submit("unlink", *keys) if keys else 0
@@ -0,0 +1,124 @@
+"""
+Session event bus
+Redis pub/sub channel that keeps the in-memory session caches of several
+server instances coherent
+"""
+
+import os
+import json
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import redis.asyncio as redis
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class SessionEventBus:
+    """
+    Publishes session lifecycle events and delivers other instances' events
+    Events look like:
+        {"type": "created" | "cleared", "origin": <instance id>,
+         "sessions": [{"project_id", "ai_name", "session_id", "version"}, ...],
+         "cleared_by": <who cleared them, on cleared events>}
+    Every session entry carries the version stamped by PostgreSQL, so a
+    receiver can ignore messages older than what it already holds
+    """
+
+    def __init__(self, client: redis.Redis, publisher=None):
+        self.client = client
+        # Anything with submit("publish", ...) - the RedisBatcher coalesces them
+        self.publisher = publisher
+        self.channel = os.getenv("SESSION_EVENTS_CHANNEL", "mcp:session-events")
+        self.instance_id = uuid.uuid4().hex
+
+        self._handler: Optional[EventHandler] = None
+        self._listener: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.published = 0
+        self.received = 0
+
+    async def publish(self, event_type: str, sessions: List[Dict[str, Any]], **fields: Any):
+        """Announce created or cleared sessions to the other instances"""
+        if not sessions:
+            return
+
+        payload = json.dumps({
+            "type": event_type,
+            "origin": self.instance_id,
+            "sessions": sessions,
+            **fields
+        }, default=str)
+
+        try:
+            if self.publisher is not None:
+                await self.publisher.submit("publish", self.channel, payload)
+            else:
+                await self.client.publish(self.channel, payload)
+            self.published += 1
+        except Exception as e:
+            # Other instances fall back to their idle TTL
+            logger.error(f"Failed to publish session event: {str(e)}")
+
+    def start(self, handler: EventHandler):
+        """Start delivering events from other instances to handler"""
+        self._handler = handler
+        self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        """Subscribe and dispatch, resubscribing after connection errors"""
+        attempt = 0
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                attempt = 0
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                attempt += 1
+                delay = min(30.0, 0.5 * 2 ** attempt)
+                logger.warning(f"Session event subscription lost ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    async def _dispatch(self, data):
+        try:
+            event = json.loads(data)
+        except (TypeError, ValueError):
+            logger.warning("Ignoring malformed session event")
+            return
+
+        if event.get("origin") == self.instance_id:
+            return  # Our own event, already applied locally
+
+        self.received += 1
+        try:
+            await self._handler(event)
+        except Exception as e:
+            logger.error(f"Session event handler failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "instance_id": self.instance_id,
+            "channel": self.channel,
+            "published": self.published,
+            "received": self.received
+        }
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
@@ -0,0 +1,129 @@
+"""
+Bounded in-memory session cache
+LRU mapping with a size cap and an idle TTL, used for SessionManager's
+active sessions and WebSocket connections
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Iterator, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SessionLRU(Generic[K, V]):
+    """
+    Dict-like LRU with a maximum size and an idle TTL
+    - Reads through [] / get() count as access and refresh the entry
+    - Inserting past max_size evicts the least recently used entry
+    - expired() lists entries idle for longer than idle_ttl so a sweeper can
+      evict them; on_evict is called for every capacity or sweep eviction
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        idle_ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[K, V], None]] = None
+    ):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self._data: "OrderedDict[K, Tuple[V, float]]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._data))
+
+    def __getitem__(self, key: K) -> V:
+        value, _ = self._data[key]
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: K, value: V):
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            old_key, (old_value, _) = self._data.popitem(last=False)
+            self._evicted(old_key, old_value)
+
+    def __delitem__(self, key: K):
+        del self._data[key]
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        if key not in self._data:
+            return default
+        return self[key]
+
+    def peek(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Read without counting as access"""
+        entry = self._data.get(key)
+        return entry[0] if entry else default
+
+    def touch(self, key: K):
+        if key in self._data:
+            self[key]
+
+    def pop(self, key: K, *default):
+        if key in self._data:
+            return self._data.pop(key)[0]
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def keys(self) -> List[K]:
+        return list(self._data)
+
+    def values(self) -> List[V]:
+        return [value for value, _ in self._data.values()]
+
+    def items(self) -> List[Tuple[K, V]]:
+        return [(key, value) for key, (value, _) in self._data.items()]
+
+    def clear(self):
+        self._data.clear()
+
+    def idle_seconds(self, key: K) -> float:
+        return time.monotonic() - self._data[key][1]
+
+    def expired(self) -> List[Tuple[K, V]]:
+        """Entries idle for longer than idle_ttl, oldest first"""
+        if self.idle_ttl is None:
+            return []
+
+        cutoff = time.monotonic() - self.idle_ttl
+        stale = []
+        for key, (value, accessed) in self._data.items():
+            if accessed > cutoff:
+                break  # Ordered by access time
+            stale.append((key, value))
+        return stale
+
+    def evict(self, key: K) -> Optional[V]:
+        """Remove an entry and report it to on_evict"""
+        if key not in self._data:
+            return None
+        value = self._data.pop(key)[0]
+        self._evicted(key, value)
+        return value
+
+    def _evicted(self, key: K, value: V):
+        self.evictions += 1
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resident": len(self._data),
+            "max_size": self.max_size,
+            "idle_ttl": self.idle_ttl,
+            "evictions": self.evictions
+        }
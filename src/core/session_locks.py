@@ -0,0 +1,90 @@
+"""
+Per-session locks
+Read-modify-write cycles on one session's history run one at a time, in
+arrival order, while different sessions proceed in parallel
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Hashable
+
+# Stdlib logging only: the file-based SimpleContextManager uses this module
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class SessionLocks:
+    """
+    One asyncio.Lock per key, created on first use and dropped once no
+    task holds or waits for it, so memory follows the active sessions
+    Wait time is measured for every acquisition; waits longer than
+    `slow_wait_ms` are logged
+    """
+
+    def __init__(self, name: str = "session", slow_wait_ms: float = 1000.0):
+        self.name = name
+        self.slow_wait_ms = slow_wait_ms
+        self._entries: Dict[Hashable, _Entry] = {}
+
+        # Metrics
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+        entry.users += 1
+
+        contended = entry.lock.locked()
+        start = time.perf_counter()
+        try:
+            await entry.lock.acquire()
+        except BaseException:
+            self._release_entry(key, entry)
+            raise
+
+        waited_ms = (time.perf_counter() - start) * 1000
+        self.acquisitions += 1
+        if contended:
+            self.contended += 1
+            self.wait_total_ms += waited_ms
+            self.wait_max_ms = max(self.wait_max_ms, waited_ms)
+            if waited_ms >= self.slow_wait_ms:
+                logger.warning(f"Waited {waited_ms:.0f}ms for {self.name} lock on {key}")
+
+        try:
+            yield
+        finally:
+            entry.lock.release()
+            self._release_entry(key, entry)
+
+    def _release_entry(self, key: Hashable, entry: _Entry):
+        entry.users -= 1
+        if entry.users == 0 and self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self._entries),
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "wait_total_ms": round(self.wait_total_ms, 3),
+            "wait_max_ms": round(self.wait_max_ms, 3),
+            "wait_avg_ms": round(self.wait_total_ms / self.contended, 3) if self.contended else 0.0
+        }
@@ -0,0 +1,434 @@
+"""
+Embedded SQLite context store
+One WAL-mode database file instead of a tree of JSON files: indexed
+history per (project, AI), concurrent readers, a single writer thread that
+commits queued writes in batches, and full-text search over messages
+"""
+
+import json
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.durability import BATCHED, NONE, STRICT, durability_level, group_commit_interval
+
+# Stdlib logging only: the file-based SimpleContextManager uses this module
+logger = logging.getLogger(__name__)
+
+# Shared by every local store (SimpleContextManager and the single-file
+# servers), so one database can hold contexts from all of them
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS contexts (
+        project_id TEXT NOT NULL,
+        ai_name TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        summary TEXT,
+        PRIMARY KEY (project_id, ai_name)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY,
+        project_id TEXT NOT NULL,
+        ai_name TEXT NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        ts TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS messages_project_ai_ts ON messages (project_id, ai_name, ts)",
+    "CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY, applied_at TEXT NOT NULL)",
+]
+
+# Optional: SQLite builds without FTS5 fall back to LIKE search
+FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts
+    USING fts5(content, content='messages', content_rowid='id')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+]
+
+_MESSAGES = """
+    SELECT role, content, ts FROM messages
+    WHERE project_id = ? AND ai_name = ?
+    ORDER BY ts DESC, id DESC LIMIT ?
+"""
+
+_TRIM = """
+    DELETE FROM messages
+    WHERE project_id = ? AND ai_name = ? AND id NOT IN (
+        SELECT id FROM messages
+        WHERE project_id = ? AND ai_name = ?
+        ORDER BY ts DESC, id DESC LIMIT ?
+    )
+"""
+
+
+def fts_query(text: str) -> str:
+    """Match every word of text literally, whatever FTS5 syntax it contains"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class SQLiteContextStore:
+    """
+    Context history in one SQLite database
+    - WAL mode: readers never block the writer or each other, across
+      threads and across server processes sharing the file
+    - Writes are queued to one writer thread and committed per the
+      durability level (core.durability): one transaction per write
+      (strict), one per group commit interval (batched), or whatever is
+      queued at that moment, unsynced (none). Each write runs in its own
+      savepoint, so one failure does not undo the others
+    - History is kept to `max_messages` per (project, AI) on every write
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_messages: int = 100,
+        max_batch: int = 256,
+        durability: Optional[str] = None,
+        interval: Optional[float] = None
+    ):
+        self.path = path
+        self.max_messages = max_messages
+        self.durability = durability_level(durability)
+        self.interval = group_commit_interval(interval)
+        self.max_batch = 1 if self.durability == STRICT else max_batch
+
+        self._local = threading.local()
+        self._queue: "queue.Queue[Optional[Tuple[Callable, Future]]]" = queue.Queue()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+        try:
+            with conn:
+                for statement in FTS_SCHEMA:
+                    conn.execute(statement)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 unavailable, searching with LIKE: {str(e)}")
+            self.fts = False
+
+        self._writer_conn = conn
+        self._writer_thread = threading.Thread(target=self._writer, name="sqlite-writer", daemon=True)
+        self._writer_thread.start()
+
+        # Metrics
+        self.batches = 0
+        self.writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA synchronous={'OFF' if self.durability == NONE else 'FULL'}")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """Per-thread read connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    # Writes
+
+    def submit(self, write: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Queue write(conn) for the writer thread; the future resolves after commit"""
+        future: Future = Future()
+        self._queue.put((write, future))
+        return future
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # Batched: keep the transaction open for writes of other sessions
+            deadline = time.monotonic() + (self.interval if self.durability == BATCHED else 0)
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._commit(batch)
+                    return
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Callable, Future]]):
+        conn = self._writer_conn
+        done = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for write, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write")
+                try:
+                    result = write(conn)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    future.set_exception(e)
+                    continue
+                conn.execute("RELEASE write")
+                done.append((future, result))
+            conn.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"Context batch commit failed: {str(e)}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for write, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.writes += len(done)
+        for future, result in done:
+            future.set_result(result)
+
+    def close(self):
+        self._queue.put(None)
+        self._writer_thread.join()
+        self._writer_conn.close()
+
+    # Write operations, run on the writer connection
+
+    def _touch(self, conn, project_id: str, ai_name: str, now: str, summary=None, set_summary=False):
+        conn.execute(
+            """
+            INSERT INTO contexts (project_id, ai_name, created_at, updated_at, summary)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (project_id, ai_name) DO UPDATE SET
+                updated_at = excluded.updated_at,
+                summary = CASE WHEN ? THEN excluded.summary ELSE contexts.summary END
+            """,
+            (project_id, ai_name, now, now, json.dumps(summary) if summary is not None else None, set_summary)
+        )
+
+    def _insert(self, conn, project_id: str, ai_name: str, messages: Iterable[Dict[str, Any]], now: str):
+        """Insert messages; those without a timestamp are stamped with now"""
+        conn.executemany(
+            "INSERT INTO messages (project_id, ai_name, role, content, ts) VALUES (?, ?, ?, ?, ?)",
+            [(project_id, ai_name, m["role"], m["content"], m.get("timestamp") or now) for m in messages]
+        )
+
+    def _trim(self, conn, project_id: str, ai_name: str) -> int:
+        conn.execute(_TRIM, (project_id, ai_name, project_id, ai_name, self.max_messages))
+        return conn.execute(
+            "SELECT count(*) FROM messages WHERE project_id = ? AND ai_name = ?",
+            (project_id, ai_name)
+        ).fetchone()[0]
+
+    def append(self, project_id: str, ai_name: str, messages: List[Dict[str, Any]]) -> Future:
+        """Append messages; resolves to the number of messages kept"""
+        def write(conn):
+            now = messages[-1].get("timestamp") or datetime.utcnow().isoformat()
+            self._touch(conn, project_id, ai_name, now)
+            self._insert(conn, project_id, ai_name, messages, now)
+            return self._trim(conn, project_id, ai_name)
+        return self.submit(write)
+
+    def update(
+        self,
+        project_id: str,
+        ai_name: str,
+        transform: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]],
+        now: str
+    ) -> Future:
+        """
+        Replace a context with transform(current context) in one write
+        Resolves to the saved context, or the current one if transform
+        returns None
+        """
+        def write(conn):
+            current = self._load(conn, project_id, ai_name, self.max_messages)
+            context = transform(current)
+            if context is None:
+                return current
+
+            messages = context.get("messages") or []
+            conn.execute(
+                "DELETE FROM messages WHERE project_id = ? AND ai_name = ?",
+                (project_id, ai_name)
+            )
+            self._touch(conn, project_id, ai_name, now, context.get("summary"), True)
+            if context.get("created_at"):
+                conn.execute(
+                    "UPDATE contexts SET created_at = ? WHERE project_id = ? AND ai_name = ?",
+                    (context["created_at"], project_id, ai_name)
+                )
+            self._insert(conn, project_id, ai_name, messages[-self.max_messages:], now)
+            return self._load(conn, project_id, ai_name, self.max_messages)
+        return self.submit(write)
+
+    def clear(self, project_id: str, ai_name: Optional[str] = None) -> Future:
+        """Delete one AI's context, or every context of the project"""
+        def write(conn):
+            where = "project_id = ?" + (" AND ai_name = ?" if ai_name is not None else "")
+            args = (project_id,) + ((ai_name,) if ai_name is not None else ())
+            conn.execute(f"DELETE FROM messages WHERE {where}", args)
+            conn.execute(f"DELETE FROM contexts WHERE {where}", args)
+        return self.submit(write)
+
+    def import_contexts(self, name: str, contexts: Iterable[Dict[str, Any]]) -> Future:
+        """
+        One-time import of existing contexts, recorded under name
+        Every process may call this; the first one to commit imports,
+        the others find the migration recorded. Contexts already in the
+        database are left as they are
+        Resolves to the number of contexts imported
+        """
+        def write(conn):
+            if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+                return 0
+            imported = 0
+            for context in contexts:
+                project_id, ai_name = context["project_id"], context["ai_name"]
+                exists = conn.execute(
+                    "SELECT 1 FROM contexts WHERE project_id = ? AND ai_name = ?",
+                    (project_id, ai_name)
+                ).fetchone()
+                if exists:
+                    continue
+                messages = [
+                    m for m in context.get("messages") or []
+                    if isinstance(m, dict) and "role" in m and "content" in m
+                ]
+                now = context.get("updated_at") or (messages[-1].get("timestamp") if messages else "")
+                conn.execute(
+                    "INSERT INTO contexts VALUES (?, ?, ?, ?, ?)",
+                    (
+                        project_id, ai_name, context.get("created_at") or now, now,
+                        json.dumps(context["summary"]) if context.get("summary") is not None else None
+                    )
+                )
+                self._insert(conn, project_id, ai_name, messages[-self.max_messages:], now)
+                imported += 1
+            conn.execute(
+                "INSERT INTO migrations VALUES (?, datetime('now'))", (name,)
+            )
+            return imported
+        return self.submit(write)
+
+    # Reads, on the calling thread's own connection
+
+    def _load(self, conn, project_id: str, ai_name: str, limit: int) -> Optional[Dict[str, Any]]:
+        row = conn.execute(
+            "SELECT created_at, updated_at, summary FROM contexts WHERE project_id = ? AND ai_name = ?",
+            (project_id, ai_name)
+        ).fetchone()
+        if row is None:
+            return None
+
+        rows = conn.execute(_MESSAGES, (project_id, ai_name, limit)).fetchall()
+        context = {
+            "project_id": project_id,
+            "ai_name": ai_name,
+            "messages": [
+                {"role": role, "content": content, "timestamp": ts}
+                for role, content, ts in reversed(rows)
+            ],
+            "created_at": row[0],
+            "updated_at": row[1]
+        }
+        if row[2] is not None:
+            context["summary"] = json.loads(row[2])
+        return context
+
+    def get_context(self, project_id: str, ai_name: str) -> Optional[Dict[str, Any]]:
+        return self._load(self._reader(), project_id, ai_name, self.max_messages)
+
+    def recent(self, project_id: str, ai_name: str, limit: int) -> List[Dict[str, Any]]:
+        rows = self._reader().execute(_MESSAGES, (project_id, ai_name, limit)).fetchall()
+        return [{"role": role, "content": content, "timestamp": ts} for role, content, ts in reversed(rows)]
+
+    def list_projects(self) -> List[str]:
+        rows = self._reader().execute("SELECT DISTINCT project_id FROM contexts ORDER BY 1").fetchall()
+        return [row[0] for row in rows]
+
+    def list_ais(self, project_id: str) -> List[str]:
+        rows = self._reader().execute(
+            "SELECT ai_name FROM contexts WHERE project_id = ? ORDER BY 1", (project_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def search(
+        self,
+        text: str,
+        project_id: Optional[str] = None,
+        ai_name: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Messages matching every word of text, best matches first"""
+        if not text.strip():
+            return []
+
+        filters, args = [], []
+        if project_id is not None:
+            filters.append("m.project_id = ?")
+            args.append(project_id)
+        if ai_name is not None:
+            filters.append("m.ai_name = ?")
+            args.append(ai_name)
+
+        if self.fts:
+            sql = (
+                "SELECT m.project_id, m.ai_name, m.role, m.content, m.ts FROM messages_fts f "
+                "JOIN messages m ON m.id = f.rowid WHERE messages_fts MATCH ?"
+            )
+            args.insert(0, fts_query(text))
+            order = "ORDER BY f.rank"
+        else:
+            sql = "SELECT m.project_id, m.ai_name, m.role, m.content, m.ts FROM messages m WHERE 1"
+            for word in text.split():
+                filters.append("m.content LIKE ? ESCAPE '\\'")
+                escaped = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                args.append(f"%{escaped}%")
+            order = "ORDER BY m.ts DESC"
+
+        for condition in filters:
+            sql += f" AND {condition}"
+        rows = self._reader().execute(f"{sql} {order} LIMIT ?", (*args, limit)).fetchall()
+        return [
+            {"project_id": p, "ai_name": a, "role": r, "content": c, "timestamp": ts}
+            for p, a, r, c, ts in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "durability": self.durability,
+            "fts": self.fts,
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "writes": self.writes
+        }
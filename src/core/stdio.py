@@ -0,0 +1,179 @@
+"""
+Concurrent JSON-RPC over stdio
+Newline-delimited requests are read without blocking the event loop,
+dispatched as independent tasks and answered as they complete
+"""
+
+import os
+import sys
+import json
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Takes one raw request line, returns the response, a list of responses
+# for a batch, or None for no response
+LineHandler = Callable[[bytes], Awaitable[Optional[Any]]]
+
+_READ_CHUNK = 64 * 1024
+
+
+async def stdin_chunks(stream=None) -> AsyncIterator[bytes]:
+    """
+    Raw stdin data as it arrives
+    Uses a pipe transport where possible; regular files and platforms
+    without pipe support fall back to reads in a worker thread
+    """
+    stream = stream or sys.stdin.buffer
+    loop = asyncio.get_running_loop()
+
+    reader = asyncio.StreamReader(limit=_READ_CHUNK)
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stream)
+    except (ValueError, OSError, NotImplementedError):
+        reader = None
+
+    while True:
+        if reader is not None:
+            chunk = await reader.read(_READ_CHUNK)
+        else:
+            chunk = await loop.run_in_executor(None, stream.read1, _READ_CHUNK)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def read_lines(chunks: AsyncIterator[bytes], max_line: int) -> AsyncIterator[Optional[bytes]]:
+    """
+    Split a byte stream into lines
+    Each byte is scanned once and consumed lines are trimmed once per
+    chunk, so multi-megabyte lines stay linear. A line longer than
+    max_line is discarded and reported as None
+    """
+    buffer = bytearray()
+    scanned = 0
+    oversized = False
+
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", scanned)
+            if end < 0:
+                break
+            line = bytes(buffer[start:end])
+            start = scanned = end + 1
+            if oversized:
+                oversized = False
+                yield None
+            elif line.strip():
+                yield line
+
+        del buffer[:start]
+        scanned = len(buffer)
+        if scanned > max_line:
+            # Keep discarding until the newline that ends this line
+            oversized = True
+            buffer.clear()
+            scanned = 0
+
+    if oversized:
+        yield None
+    elif buffer.strip():
+        yield bytes(buffer)
+
+
+class StdioServer:
+    """
+    Reads requests from stdin and writes responses to stdout
+    - Every request runs as its own task, at most `max_concurrency` at
+      once; a slow AI call no longer holds up a tools/list behind it
+    - Responses carry their request id and are written as they finish,
+      whole lines only, by a single writer task
+    - Reading pauses while all slots are busy, bounding memory
+    """
+
+    def __init__(
+        self,
+        handle_line: LineHandler,
+        max_concurrency: Optional[int] = None,
+        max_line: Optional[int] = None
+    ):
+        self.handle_line = handle_line
+        self.max_concurrency = max_concurrency or int(os.getenv("MCP_STDIO_CONCURRENCY", "8"))
+        self.max_line = max_line or int(os.getenv("MCP_STDIO_MAX_LINE", str(64 * 1024 * 1024)))
+
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def run(self, chunks: Optional[AsyncIterator[bytes]] = None):
+        """Serve until stdin closes and every in-flight request is answered"""
+        writer = asyncio.create_task(self._writer())
+        try:
+            async for line in read_lines(chunks or stdin_chunks(), self.max_line):
+                if line is None:
+                    self.send(self.error(-32700, "Parse error", None, "Request line too long"))
+                    continue
+
+                await self._slots.acquire()
+                task = asyncio.create_task(self._dispatch(line))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            await self._outbox.put(None)
+            await writer
+
+    async def _dispatch(self, line: bytes):
+        try:
+            response = await self.handle_line(line)
+        except Exception as e:
+            logger.error(f"Stdio handler error: {str(e)}")
+            response = self.error(-32603, "Internal error", self._request_id(line), str(e))
+        finally:
+            self._slots.release()
+        self.send(response)
+
+    def send(self, response: Optional[Any]):
+        if response is not None:
+            self._outbox.put_nowait(response)
+
+    async def _writer(self):
+        """Single writer: one complete line per response"""
+        loop = asyncio.get_running_loop()
+        while True:
+            response = await self._outbox.get()
+            if response is None:
+                return
+            data = json.dumps(response, default=str) + "\n"
+            try:
+                # Large responses are written off the event loop
+                await loop.run_in_executor(None, self._write, data)
+            except Exception as e:
+                logger.error(f"Stdout write failed: {str(e)}")
+
+    @staticmethod
+    def _write(data: str):
+        sys.stdout.write(data)
+        sys.stdout.flush()
+
+    @staticmethod
+    def _request_id(line: bytes):
+        try:
+            request = json.loads(line)
+            return request.get("id") if isinstance(request, dict) else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def error(code: int, message: str, request_id=None, data: Any = None) -> Dict[str, Any]:
+        error = {"code": code, "message": message}
+        if data is not None:
+            error["data"] = data
+        return {"jsonrpc": "2.0", "error": error, "id": request_id}
@@ -0,0 +1,200 @@
+"""
+WebSocket registry
+Connections indexed by session and by project, each with its own bounded
+send queue so one slow client never stalls a broadcast
+"""
+
+import os
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import WebSocket
+from fastapi.websockets import WebSocketState
+
+from core.session_cache import SessionLRU
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class Connection:
+    """A registered WebSocket and its outbound queue"""
+    __slots__ = ("session_id", "project_id", "websocket", "queue", "sender", "dropped")
+
+    def __init__(self, session_id: str, project_id: Optional[str], websocket: WebSocket, max_queue: int):
+        self.session_id = session_id
+        self.project_id = project_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.sender: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    @property
+    def connected(self) -> bool:
+        return (
+            self.websocket.client_state == WebSocketState.CONNECTED
+            and self.websocket.application_state == WebSocketState.CONNECTED
+        )
+
+
+class WebSocketRegistry:
+    """
+    Index of live connections: project -> sessions -> socket
+    - Every connection has a single writer task draining a bounded queue;
+      each send is bounded by `send_timeout`
+    - broadcast() only enqueues, so fan-out is concurrent across clients
+    - A full queue means a slow consumer: the message is dropped, or with
+      WEBSOCKET_SLOW_CONSUMER=disconnect the client is disconnected
+    """
+
+    def __init__(self):
+        self.max_queue = int(os.getenv("WEBSOCKET_SEND_QUEUE", "100"))
+        self.send_timeout = float(os.getenv("WEBSOCKET_SEND_TIMEOUT", "5"))
+        self.slow_consumer = os.getenv("WEBSOCKET_SLOW_CONSUMER", "drop")
+
+        self.connections: SessionLRU[str, Connection] = SessionLRU(
+            max_size=int(os.getenv("WEBSOCKET_MAX", "10000")),
+            on_evict=self._on_evicted
+        )
+        self._by_project: Dict[str, Set[str]] = {}
+
+        # Metrics
+        self.sent = 0
+        self.dropped = 0
+        self.timeouts = 0
+        self.disconnected = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.connections
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+    def register(self, session_id: str, websocket: WebSocket, project_id: Optional[str] = None):
+        """Register a connection; a reconnect replaces the previous socket"""
+        previous = self.connections.pop(session_id, None)
+        if previous is not None:
+            self._detach(previous)
+            self._spawn_close(previous.websocket)
+
+        conn = Connection(session_id, project_id, websocket, self.max_queue)
+        conn.sender = asyncio.create_task(self._sender(conn))
+        self.connections[session_id] = conn
+        if project_id:
+            self._by_project.setdefault(project_id, set()).add(session_id)
+
+    def unregister(self, session_id: str) -> Optional[WebSocket]:
+        conn = self.connections.pop(session_id, None)
+        if conn is None:
+            return None
+        self._detach(conn)
+        return conn.websocket
+
+    def project_sessions(self, project_id: str) -> List[str]:
+        return list(self._by_project.get(project_id, ()))
+
+    def send(self, session_id: str, message: Dict[str, Any]) -> bool:
+        """Queue a message for one session; returns whether it was queued"""
+        conn = self.connections.peek(session_id)
+        return conn is not None and self._enqueue(conn, message)
+
+    def broadcast(self, project_id: str, message: Dict[str, Any]) -> int:
+        """Queue a message for every connection of a project"""
+        queued = 0
+        for session_id in self.project_sessions(project_id):
+            conn = self.connections.peek(session_id)
+            if conn is not None and self._enqueue(conn, message):
+                queued += 1
+        return queued
+
+    def _enqueue(self, conn: Connection, message: Dict[str, Any]) -> bool:
+        try:
+            conn.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            if self.slow_consumer == "disconnect":
+                self._disconnect(conn, "send queue full")
+            else:
+                conn.dropped += 1
+                self.dropped += 1
+            return False
+
+    async def _sender(self, conn: Connection):
+        """Single writer for one connection"""
+        while True:
+            message = await conn.queue.get()
+            try:
+                await asyncio.wait_for(conn.websocket.send_json(message), self.send_timeout)
+                self.sent += 1
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self._disconnect(conn, "send timed out")
+                return
+            except Exception as e:
+                self._disconnect(conn, str(e))
+                return
+
+    def _disconnect(self, conn: Connection, reason: str):
+        if self.connections.peek(conn.session_id) is conn:
+            self.connections.pop(conn.session_id)
+        self._detach(conn)
+        self.disconnected += 1
+        logger.warning(f"Disconnecting WebSocket for session {conn.session_id}: {reason}")
+        self._spawn_close(conn.websocket)
+
+    def _detach(self, conn: Connection):
+        """Remove from the project index and stop the writer"""
+        sessions = self._by_project.get(conn.project_id)
+        if sessions is not None:
+            sessions.discard(conn.session_id)
+            if not sessions:
+                del self._by_project[conn.project_id]
+
+        if conn.sender and conn.sender is not asyncio.current_task():
+            conn.sender.cancel()
+
+    def _on_evicted(self, session_id: str, conn: Connection):
+        """Pushed out by capacity"""
+        self._detach(conn)
+        self._spawn_close(conn.websocket)
+
+    @staticmethod
+    def _spawn_close(websocket: WebSocket):
+        async def close():
+            try:
+                await websocket.close()
+            except Exception:
+                pass  # Already gone
+
+        try:
+            asyncio.get_running_loop().create_task(close())
+        except RuntimeError:
+            pass
+
+    def sweep(self) -> int:
+        """Drop connections whose socket is no longer connected"""
+        dead = [conn for conn in self.connections.values() if not conn.connected]
+        for conn in dead:
+            self._disconnect(conn, "connection closed")
+        return len(dead)
+
+    async def close_all(self):
+        for conn in self.connections.values():
+            self._detach(conn)
+            try:
+                await conn.websocket.close()
+            except Exception:
+                pass
+        self.connections.clear()
+        self._by_project.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.connections.stats(),
+            "projects": len(self._by_project),
+            "queued": sum(conn.queue.qsize() for conn in self.connections.values()),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "timeouts": self.timeouts,
+            "disconnected": self.disconnected
+        }
@@ -9,15 +9,16 @@ import sys
 import json
 import asyncio
 import logging
+import uuid
 from contextlib import asynccontextmanager
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Union
 
-from fastapi import FastAPI, WebSocket, HTTPException, Depends
+from fastapi import FastAPI, WebSocket, HTTPException, Depends, Body, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -30,6 +31,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from core.context_manager import ContextManager
 from core.mcp_protocol import MCPProtocolHandler
 from core.session_manager import SessionManager
+from core.maintenance import MaintenanceScheduler, vacuum_tables
+from core.stdio import StdioServer
 from core.ai_router import AIContextRouter
 from services.debug_service import DebugService
 from services.analysis_service import AnalysisService
@@ -47,6 +50,13 @@ class MCPRequest(BaseModel):
     id: Optional[int] = None
 
 
+class ClearRequest(BaseModel):
+    """Admin bulk clear request"""
+    project_paths: List[str] = Field(default_factory=list)
+    project_ids: List[str] = Field(default_factory=list)
+    ai_names: Optional[List[str]] = None
+
+
 class MCPResponse(BaseModel):
     """MCP Protocol Response Model"""
     jsonrpc: str = "2.0"
@@ -55,6 +65,47 @@ class MCPResponse(BaseModel):
     id: Optional[int] = None
 
 
+def create_maintenance_scheduler(
+    context_manager: ContextManager,
+    session_manager: SessionManager
+) -> MaintenanceScheduler:
+    """Register the background maintenance jobs"""
+    scheduler = MaintenanceScheduler(session_manager.redis_client)
+    cleanup_interval = float(os.getenv("MAINTENANCE_CLEANUP_INTERVAL", "3600"))
+    
+    scheduler.register(
+        "sessions.cleanup", cleanup_interval,
+        lambda batch: session_manager.cleanup_batches(
+            int(os.getenv("SESSION_INACTIVE_HOURS", "24")), batch
+        )
+    )
+    scheduler.register(
+        "contexts.cleanup", cleanup_interval,
+        lambda batch: context_manager.cleanup_batches(batch_size=batch)
+    )
+    scheduler.register(
+        "contexts.summarize", float(os.getenv("MAINTENANCE_SUMMARIZE_INTERVAL", "900")),
+        lambda batch: context_manager.summarize_batches(batch_size=batch),
+        batch_size=50
+    )
+    scheduler.register(
+        "history.gc", cleanup_interval,
+        lambda batch: session_manager.history_gc_batches(
+            float(os.getenv("HISTORY_GC_GRACE_HOURS", "72")), batch
+        )
+    )
+    scheduler.register(
+        "vacuum", float(os.getenv("MAINTENANCE_VACUUM_INTERVAL", "21600")),
+        lambda batch: vacuum_tables(
+            context_manager.pg_pool,
+            ["conversations", "messages%", "conversation_summaries",
+             "project_contexts", "ai_sessions", "projects", "clear_events"],
+            min_dead_tuples=int(os.getenv("MAINTENANCE_VACUUM_MIN_DEAD", "1000"))
+        )
+    )
+    return scheduler
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle application lifecycle"""
@@ -73,15 +124,34 @@ async def lifespan(app: FastAPI):
     await app.state.context_manager.initialize()
     await app.state.session_manager.initialize()
     await app.state.ai_router.initialize()
+    
+    # Summaries of compacted history may use a configured AI
+    app.state.context_manager.compactor.ai_router = app.state.ai_router
+    
+    # Contexts of active sessions are pinned in the cache
+    app.state.session_manager.cache_policy = app.state.context_manager.cache_policy
+    
+    # Tool call results for client retries are shared through Redis
+    app.state.mcp_handler.idempotency.client = app.state.context_manager.redis_client
     await app.state.debug_service.initialize()
     await app.state.analysis_service.initialize()
     
+    # Periodic cleanup, summarization and vacuum on one elected instance
+    app.state.maintenance = None
+    if os.getenv("MAINTENANCE_ENABLED", "true").lower() == "true":
+        app.state.maintenance = create_maintenance_scheduler(
+            app.state.context_manager, app.state.session_manager
+        )
+        app.state.maintenance.start()
+    
     logger.info("MCP Server started successfully")
     
     yield
     
     # Shutdown
     logger.info("Shutting down MCP Server...")
+    if app.state.maintenance:
+        await app.state.maintenance.close()
     await app.state.context_manager.close()
     await app.state.session_manager.close()
     logger.info("MCP Server shutdown complete")
@@ -133,15 +203,21 @@ async def health_check():
             "session_manager": app.state.session_manager.is_healthy(),
             "debug_service": app.state.debug_service.is_healthy(),
             "analysis_service": app.state.analysis_service.is_healthy()
-        }
+        },
+        "sessions": app.state.session_manager.resident_counts(),
+        "context_locks": app.state.context_manager.lock_stats(),
+        "idempotency": app.state.mcp_handler.idempotency.stats(),
+        "maintenance": app.state.maintenance.stats() if app.state.maintenance else None,
+        "database_pool": (
+            app.state.context_manager.pg_pool.metrics()
+            if app.state.context_manager.pg_pool else None
+        )
     }
 
 
-@app.post("/mcp")
-async def handle_mcp_request(request: MCPRequest):
-    """Handle MCP protocol requests"""
+async def run_mcp_request(request: MCPRequest, client_id: Optional[str] = None) -> MCPResponse:
+    """Process one request through the MCP handler"""
     try:
-        # Process the request through MCP handler
         result = await app.state.mcp_handler.handle_request(
             method=request.method,
             params=request.params,
@@ -149,7 +225,8 @@ async def handle_mcp_request(request: MCPRequest):
             context_manager=app.state.context_manager,
             session_manager=app.state.session_manager,
             debug_service=app.state.debug_service,
-            analysis_service=app.state.analysis_service
+            analysis_service=app.state.analysis_service,
+            client_id=client_id
         )
         
         return MCPResponse(
@@ -170,6 +247,58 @@ async def handle_mcp_request(request: MCPRequest):
         )
 
 
+async def run_mcp_batch(items: List[Any], client_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Process a JSON-RPC batch
+    Items run concurrently (at most MCP_BATCH_CONCURRENCY at once), each with
+    its own result or error; responses keep request order and notifications
+    (items without an id) get none
+    """
+    if not items:
+        return [{
+            "jsonrpc": "2.0",
+            "error": {"code": -32600, "message": "Invalid Request", "data": "Empty batch"},
+            "id": None
+        }]
+    
+    slots = asyncio.Semaphore(int(os.getenv("MCP_BATCH_CONCURRENCY", "8")))
+    
+    async def run_item(item: Any) -> Optional[Dict[str, Any]]:
+        try:
+            request = MCPRequest(**item)
+        except (TypeError, ValueError) as e:
+            return {
+                "jsonrpc": "2.0",
+                "error": {"code": -32600, "message": "Invalid Request", "data": str(e)},
+                "id": item.get("id") if isinstance(item, dict) else None
+            }
+        
+        async with slots:
+            response = await run_mcp_request(request, client_id)
+        return response.model_dump() if "id" in item else None
+    
+    responses = await asyncio.gather(*(run_item(item) for item in items))
+    return [response for response in responses if response is not None]
+
+
+@app.post("/mcp")
+async def handle_mcp_request(
+    payload: Union[MCPRequest, List[Any]] = Body(...),
+    mcp_session_id: Optional[str] = Header(None)
+):
+    """
+    Handle MCP protocol requests, single or batched
+    Retried tool calls are only deduplicated by request id within the
+    client's Mcp-Session-Id
+    """
+    if isinstance(payload, list):
+        responses = await run_mcp_batch(payload, mcp_session_id)
+        # A batch of notifications has nothing to return
+        return responses if responses else Response(status_code=204)
+    
+    return await run_mcp_request(payload, mcp_session_id)
+
+
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for real-time features"""
@@ -191,8 +320,8 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 debug_service=app.state.debug_service
             )
             
-            # Send response
-            await websocket.send_json(response)
+            # Send response through the connection's single writer
+            app.state.session_manager.send_to_session(session_id, response)
             
     except Exception as e:
         logger.error(f"WebSocket error for session {session_id}: {str(e)}")
@@ -201,13 +330,49 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         await app.state.session_manager.unregister_websocket(session_id)
 
 
+@app.get("/cache/report")
+async def cache_report(top: int = 20):
+    """Report what is occupying context cache memory"""
+    return await app.state.context_manager.cache_policy.report(top=top)
+
+
+@app.post("/admin/clear")
+async def admin_clear(request: ClearRequest):
+    """Clear AI contexts for many projects in one transaction"""
+    session_manager = app.state.session_manager
+    project_ids = request.project_ids + [
+        session_manager.get_project_id(path) for path in request.project_paths
+    ]
+    if not project_ids:
+        raise HTTPException(status_code=400, detail="No projects given")
+    
+    cleared = await session_manager.clear_sessions(
+        project_ids, request.ai_names, cleared_by="admin"
+    )
+    return {"status": "ok", "projects": len(project_ids), "cleared_sessions": cleared}
+
+
+@app.get("/stats")
+async def global_stats():
+    """Message, token, byte, session and clear totals across all projects"""
+    return await app.state.session_manager.get_global_stats()
+
+
+@app.get("/admin/gc/report")
+async def history_gc_report(grace_hours: Optional[float] = None):
+    """Dry run: history of cleared sessions the GC job would reclaim"""
+    if grace_hours is None:
+        grace_hours = float(os.getenv("HISTORY_GC_GRACE_HOURS", "72"))
+    return await app.state.session_manager.history_gc_report(grace_hours)
+
+
 @app.post("/context/{session_id}")
 async def get_context(session_id: str):
     """Get context for a session"""
     context = await app.state.context_manager.get_context(session_id)
     if not context:
         raise HTTPException(status_code=404, detail="Session not found")
-    return context
+    return context.to_model()
 
 
 @app.post("/debug/start")
@@ -232,69 +397,29 @@ async def analyze_code(code: str, language: str = "python"):
 
 # Standard MCP protocol handling for stdio
 async def handle_stdio():
-    """Handle MCP protocol over stdio"""
+    """Handle MCP protocol over stdio, serving requests concurrently"""
     logger.info("Starting stdio MCP handler...")
     
-    while True:
+    # One client per stdio process; request ids restart with the process
+    client_id = f"stdio:{uuid.uuid4().hex}"
+    
+    async def handle_line(line: bytes) -> Optional[Any]:
+        # Parse JSON-RPC request or batch
         try:
-            # Read from stdin
-            line = sys.stdin.readline()
-            if not line:
-                break
-                
-            # Parse JSON-RPC request
-            try:
-                request_data = json.loads(line.strip())
-                request = MCPRequest(**request_data)
-            except json.JSONDecodeError as e:
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32700,
-                        "message": "Parse error",
-                        "data": str(e)
-                    },
-                    "id": None
-                }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
-                continue
-            
-            # Handle the request
-            result = await app.state.mcp_handler.handle_request(
-                method=request.method,
-                params=request.params,
-                request_id=request.id,
-                context_manager=app.state.context_manager,
-                session_manager=app.state.session_manager,
-                debug_service=app.state.debug_service,
-                analysis_service=app.state.analysis_service
-            )
-            
-            # Send response
-            response = {
-                "jsonrpc": "2.0",
-                "result": result,
-                "id": request.id
-            }
-            print(json.dumps(response))
-            sys.stdout.flush()
-            
-        except KeyboardInterrupt:
-            break
-        except Exception as e:
-            logger.error(f"Stdio handler error: {str(e)}")
-            error_response = {
-                "jsonrpc": "2.0",
-                "error": {
-                    "code": -32603,
-                    "message": "Internal error",
-                    "data": str(e)
-                },
-                "id": None
-            }
-            print(json.dumps(error_response))
-            sys.stdout.flush()
+            request_data = json.loads(line)
+        except json.JSONDecodeError as e:
+            return StdioServer.error(-32700, "Parse error", None, str(e))
+        
+        if isinstance(request_data, list):
+            return await run_mcp_batch(request_data, client_id) or None
+        
+        response = await run_mcp_request(MCPRequest(**request_data), client_id)
+        return response.model_dump()
+    
+    try:
+        await StdioServer(handle_line).run()
+    except KeyboardInterrupt:
+        pass
 
 
 def main():
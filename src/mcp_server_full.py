@@ -10,8 +10,10 @@ import os
 from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 import hashlib
+import uuid
 from datetime import datetime
 import asyncio
+import random
 import redis
 import asyncpg
 from contextlib import asynccontextmanager
@@ -31,6 +33,17 @@ class DatabaseManager:
         self.pg_pool = None
         self.initialized = False
         
+        # Pool sizing and reconnect backoff
+        self.pool_min_size = int(os.getenv('POSTGRES_POOL_MIN_SIZE', 1))
+        self.pool_max_size = int(os.getenv('POSTGRES_POOL_MAX_SIZE', 5))
+        self.reconnect_attempts = int(os.getenv('POSTGRES_RECONNECT_ATTEMPTS', 5))
+        self.reconnect_max_delay = float(os.getenv('POSTGRES_RECONNECT_MAX_DELAY', 10))
+        
+        # Session access times, written to updated_at in periodic batches
+        self.access_flush_interval = float(os.getenv('ACCESS_FLUSH_INTERVAL', 30))
+        self._accessed: Dict[int, datetime] = {}
+        self._flush_task = None
+        
     async def initialize(self):
         """Initialize database connections"""
         if self.initialized:
@@ -47,15 +60,7 @@ class DatabaseManager:
             print("Redis connected", file=sys.stderr)
             
             # Connect to PostgreSQL
-            self.pg_pool = await asyncpg.create_pool(
-                host=os.getenv('POSTGRES_HOST', 'localhost'),
-                port=int(os.getenv('POSTGRES_PORT', 5432)),
-                user=os.getenv('POSTGRES_USER', 'mcp_user'),
-                password=os.getenv('POSTGRES_PASSWORD', 'mcp_password'),
-                database=os.getenv('POSTGRES_DB', 'mcp_dev'),
-                min_size=1,
-                max_size=5
-            )
+            self.pg_pool = await self._create_pool()
             
             # Create tables if needed
             async with self.pg_pool.acquire() as conn:
@@ -86,7 +91,21 @@ class DatabaseManager:
                     ON ai_messages(session_id)
                 ''')
                 
+                # Counters kept at write time; project_id '*' holds the totals
+                await conn.execute('''
+                    CREATE TABLE IF NOT EXISTS ai_stats (
+                        project_id VARCHAR(255) PRIMARY KEY,
+                        sessions BIGINT NOT NULL DEFAULT 0,
+                        messages BIGINT NOT NULL DEFAULT 0,
+                        tokens BIGINT NOT NULL DEFAULT 0,
+                        bytes BIGINT NOT NULL DEFAULT 0,
+                        clears BIGINT NOT NULL DEFAULT 0
+                    )
+                ''')
+                await self._backfill_stats(conn)
+                
             print("PostgreSQL connected and tables created", file=sys.stderr)
+            self._flush_task = asyncio.create_task(self._flush_loop())
             self.initialized = True
             
         except Exception as e:
@@ -94,51 +113,214 @@ class DatabaseManager:
             # Continue without databases - fallback to memory
             self.initialized = True
     
+    async def _backfill_stats(self, conn):
+        """Count history written before ai_stats existed, once"""
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('ai_stats'))")
+            if await conn.fetchval("SELECT EXISTS (SELECT 1 FROM ai_stats)"):
+                return
+            await conn.execute('''
+                WITH per_project AS (
+                    SELECT s.project_id,
+                           count(DISTINCT s.id) AS sessions,
+                           count(m.id) AS messages,
+                           COALESCE(sum(m.tokens), 0) AS tokens,
+                           COALESCE(sum(octet_length(m.content)), 0) AS bytes
+                    FROM ai_sessions s
+                    LEFT JOIN ai_messages m ON m.session_id = s.id
+                    GROUP BY s.project_id
+                )
+                INSERT INTO ai_stats (project_id, sessions, messages, tokens, bytes)
+                SELECT project_id, sessions, messages, tokens, bytes FROM per_project
+                UNION ALL
+                SELECT '*', COALESCE(sum(sessions), 0), COALESCE(sum(messages), 0),
+                       COALESCE(sum(tokens), 0), COALESCE(sum(bytes), 0)
+                FROM per_project
+            ''')
+    
+    async def _create_pool(self):
+        """Create the PostgreSQL pool, retrying with exponential backoff"""
+        attempt = 0
+        while True:
+            try:
+                return await asyncpg.create_pool(
+                    host=os.getenv('POSTGRES_HOST', 'localhost'),
+                    port=int(os.getenv('POSTGRES_PORT', 5432)),
+                    user=os.getenv('POSTGRES_USER', 'mcp_user'),
+                    password=os.getenv('POSTGRES_PASSWORD', 'mcp_password'),
+                    database=os.getenv('POSTGRES_DB', 'mcp_dev'),
+                    min_size=self.pool_min_size,
+                    max_size=self.pool_max_size,
+                    # Warm up: every new connection runs a round trip first
+                    init=lambda conn: conn.fetchval('SELECT 1')
+                )
+            except (OSError, asyncpg.CannotConnectNowError) as e:
+                attempt += 1
+                if attempt >= self.reconnect_attempts:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"PostgreSQL unavailable ({e}), retrying in {delay:.1f}s", file=sys.stderr)
+                await asyncio.sleep(delay)
+    
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter"""
+        return min(self.reconnect_max_delay, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+    
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Acquire a pooled connection
+        After a Postgres restart every pooled connection is stale: the first
+        failure expires them all and waits with backoff until the server is
+        reachable again, so the next call gets a fresh connection
+        """
+        if self.pg_pool is None:
+            self.pg_pool = await self._create_pool()
+        
+        try:
+            async with self.pg_pool.acquire() as conn:
+                yield conn
+        except (asyncpg.ConnectionDoesNotExistError, asyncpg.CannotConnectNowError,
+                asyncpg.InterfaceError, ConnectionError) as e:
+            print(f"PostgreSQL connection lost ({e}), reconnecting", file=sys.stderr)
+            self.pg_pool.expire_connections()
+            await self._wait_for_postgres()
+            raise
+    
+    async def _wait_for_postgres(self):
+        """Poll the server with backoff until a connection succeeds"""
+        for attempt in range(1, self.reconnect_attempts + 1):
+            try:
+                async with self.pg_pool.acquire() as conn:
+                    await conn.fetchval('SELECT 1')
+                return
+            except Exception:
+                await asyncio.sleep(self._backoff(attempt))
+    
     async def get_or_create_session(self, project_id: str, ai_name: str) -> int:
         """Get or create a session for an AI in a project"""
-        async with self.pg_pool.acquire() as conn:
-            # Try to get existing session
-            row = await conn.fetchrow('''
-                SELECT id FROM ai_sessions 
-                WHERE project_id = $1 AND ai_name = $2
-            ''', project_id, ai_name)
-            
-            if row:
-                # Update last accessed time
+        sessions = await self.get_or_create_sessions(project_id, [ai_name])
+        return sessions[ai_name]
+    
+    async def get_or_create_sessions(self, project_id: str, ai_names: List[str]) -> Dict[str, int]:
+        """
+        Get or create sessions for several AIs in a project in one round trip
+        Only missing sessions are inserted, so lookups don't consume sequence
+        values; access times are recorded in memory and flushed in batches
+        """
+        async with self.connection() as conn:
+            rows = await conn.fetch('''
+                WITH existing AS (
+                    SELECT ai_name, id FROM ai_sessions 
+                    WHERE project_id = $1 AND ai_name = ANY($2::text[])
+                ),
+                created AS (
+                    INSERT INTO ai_sessions (project_id, ai_name) 
+                    SELECT $1, w.ai_name FROM unnest($2::text[]) AS w(ai_name)
+                    WHERE NOT EXISTS (SELECT 1 FROM existing e WHERE e.ai_name = w.ai_name)
+                    ON CONFLICT (project_id, ai_name) 
+                    DO UPDATE SET updated_at = CURRENT_TIMESTAMP
+                    RETURNING ai_name, id, (xmax = 0) AS inserted
+                ),
+                stats AS (
+                    INSERT INTO ai_stats AS st (project_id, sessions)
+                    SELECT scope, count(*)
+                    FROM created, unnest(ARRAY[$1, '*']) AS scope
+                    WHERE created.inserted
+                    GROUP BY scope
+                    ON CONFLICT (project_id) 
+                    DO UPDATE SET sessions = st.sessions + EXCLUDED.sessions
+                )
+                SELECT ai_name, id FROM existing
+                UNION ALL
+                SELECT ai_name, id FROM created
+            ''', project_id, list(ai_names))
+        
+        now = datetime.utcnow()
+        for row in rows:
+            self._accessed[row['id']] = now
+        return {row['ai_name']: row['id'] for row in rows}
+    
+    async def flush_access(self):
+        """Write pending access times to ai_sessions.updated_at in one UPDATE"""
+        if not self._accessed:
+            return
+        
+        pending, self._accessed = self._accessed, {}
+        ids = sorted(pending)
+        try:
+            async with self.connection() as conn:
                 await conn.execute('''
-                    UPDATE ai_sessions 
-                    SET updated_at = CURRENT_TIMESTAMP 
-                    WHERE id = $1
-                ''', row['id'])
-                return row['id']
-            
-            # Create new session
-            row = await conn.fetchrow('''
-                INSERT INTO ai_sessions (project_id, ai_name) 
-                VALUES ($1, $2) 
-                RETURNING id
-            ''', project_id, ai_name)
-            return row['id']
+                    UPDATE ai_sessions s 
+                    SET updated_at = GREATEST(s.updated_at, t.accessed) 
+                    FROM unnest($1::int[], $2::timestamp[]) AS t(id, accessed) 
+                    WHERE s.id = t.id
+                ''', ids, [pending[i] for i in ids])
+        except Exception:
+            # Keep them for the next flush, unless touched again since
+            for session_id, accessed in pending.items():
+                self._accessed.setdefault(session_id, accessed)
+            raise
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.access_flush_interval)
+            try:
+                await self.flush_access()
+            except Exception as e:
+                print(f"Access time flush failed: {e}", file=sys.stderr)
     
     async def add_message(self, session_id: int, role: str, content: str):
         """Add a message to the conversation history"""
-        async with self.pg_pool.acquire() as conn:
+        await self.add_messages(session_id, [(role, content)])
+    
+    async def append_exchange(self, session_id: int, prompt: str, response: str):
+        """Add a prompt and its response together, in one transaction"""
+        await self.add_messages(session_id, [("user", prompt), ("assistant", response)])
+    
+    async def add_messages(self, session_id: int, messages: List[Tuple[str, str]]):
+        """
+        Add (role, content) messages in order with one INSERT, counting them
+        in ai_stats in the same statement
+        clock_timestamp() keeps timestamps increasing within the statement
+        """
+        roles = [role for role, _ in messages]
+        contents = [content for _, content in messages]
+        async with self.connection() as conn:
             await conn.execute('''
-                INSERT INTO ai_messages (session_id, role, content, tokens) 
-                VALUES ($1, $2, $3, $4)
-            ''', session_id, role, content, len(content.split()))
+                WITH msg AS (
+                    INSERT INTO ai_messages (session_id, role, content, tokens, timestamp) 
+                    SELECT $1, m.role, m.content, m.tokens, clock_timestamp()
+                    FROM unnest($2::text[], $3::text[], $4::int[]) WITH ORDINALITY AS m(role, content, tokens, ord)
+                    ORDER BY m.ord
+                    RETURNING tokens, octet_length(content) AS bytes
+                ),
+                totals AS (
+                    SELECT count(*) AS messages, sum(tokens) AS tokens, sum(bytes) AS bytes FROM msg
+                ),
+                scopes AS (
+                    SELECT s.project_id AS scope FROM ai_sessions s WHERE s.id = $1
+                    UNION ALL
+                    SELECT '*'
+                )
+                INSERT INTO ai_stats AS st (project_id, messages, tokens, bytes)
+                SELECT scope, totals.messages, totals.tokens, totals.bytes FROM scopes, totals
+                ON CONFLICT (project_id) DO UPDATE SET 
+                    messages = st.messages + EXCLUDED.messages,
+                    tokens = st.tokens + EXCLUDED.tokens,
+                    bytes = st.bytes + EXCLUDED.bytes
+            ''', session_id, roles, contents, [len(content.split()) for content in contents])
             
-        # Also cache in Redis for fast access
+        # Also cache in Redis for fast access: push, keep only the last 10
+        # messages and expire after 1 hour, atomically in one round trip
         cache_key = f"session:{session_id}:latest"
-        await asyncio.to_thread(
-            self.redis_client.lpush, 
-            cache_key, 
-            json.dumps({"role": role, "content": content})
-        )
-        # Keep only last 10 messages in cache
-        await asyncio.to_thread(self.redis_client.ltrim, cache_key, 0, 9)
-        # Expire after 1 hour
-        await asyncio.to_thread(self.redis_client.expire, cache_key, 3600)
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.lpush(cache_key, *[
+            json.dumps({"role": role, "content": content}) for role, content in messages
+        ])
+        pipe.ltrim(cache_key, 0, 9)
+        pipe.expire(cache_key, 3600)
+        await asyncio.to_thread(pipe.execute)
     
     async def get_context(self, session_id: int, limit: int = 20) -> List[Dict]:
         """Get conversation context from cache or database"""
@@ -154,7 +336,7 @@ class DatabaseManager:
             return messages
         
         # Fallback to PostgreSQL
-        async with self.pg_pool.acquire() as conn:
+        async with self.connection() as conn:
             rows = await conn.fetch('''
                 SELECT role, content, timestamp 
                 FROM ai_messages 
@@ -175,27 +357,63 @@ class DatabaseManager:
     
     async def clear_session(self, project_id: str, ai_name: str):
         """Clear all messages for a session"""
-        async with self.pg_pool.acquire() as conn:
-            # Get session ID
-            row = await conn.fetchrow('''
-                SELECT id FROM ai_sessions 
-                WHERE project_id = $1 AND ai_name = $2
-            ''', project_id, ai_name)
-            
-            if row:
-                session_id = row['id']
-                # Delete all messages
-                await conn.execute('''
-                    DELETE FROM ai_messages WHERE session_id = $1
-                ''', session_id)
-                
-                # Clear Redis cache
-                cache_key = f"session:{session_id}:latest"
-                await asyncio.to_thread(self.redis_client.delete, cache_key)
+        await self.clear_sessions([project_id], [ai_name])
+    
+    async def clear_sessions(self, project_ids: List[str], ai_names: List[str]) -> int:
+        """
+        Clear sessions for any number of AIs and projects at once
+        One DELETE removes the sessions (their messages cascade) and takes
+        them out of ai_stats in a single statement, then one DEL drops every
+        cached message list
+        """
+        async with self.connection() as conn:
+            rows = await conn.fetch('''
+                WITH deleted AS (
+                    DELETE FROM ai_sessions 
+                    WHERE project_id = ANY($1::text[]) AND ai_name = ANY($2::text[])
+                    RETURNING id, project_id
+                ),
+                per_project AS (
+                    SELECT d.project_id,
+                           count(DISTINCT d.id) AS sessions,
+                           count(m.id) AS messages,
+                           COALESCE(sum(m.tokens), 0) AS tokens,
+                           COALESCE(sum(octet_length(m.content)), 0) AS bytes
+                    FROM deleted d
+                    LEFT JOIN ai_messages m ON m.session_id = d.id
+                    GROUP BY d.project_id
+                ),
+                stats AS (
+                    INSERT INTO ai_stats AS st (project_id, sessions, messages, tokens, bytes, clears)
+                    SELECT project_id, -sessions, -messages, -tokens, -bytes, sessions
+                    FROM per_project
+                    UNION ALL
+                    SELECT '*', -sum(sessions), -sum(messages), -sum(tokens), -sum(bytes), sum(sessions)
+                    FROM per_project HAVING count(*) > 0
+                    ON CONFLICT (project_id) DO UPDATE SET 
+                        sessions = st.sessions + EXCLUDED.sessions,
+                        messages = st.messages + EXCLUDED.messages,
+                        tokens = st.tokens + EXCLUDED.tokens,
+                        bytes = st.bytes + EXCLUDED.bytes,
+                        clears = st.clears + EXCLUDED.clears
+                )
+                SELECT id FROM deleted
+            ''', list(project_ids), list(ai_names))
+        
+        if rows:
+            cache_keys = [f"session:{row['id']}:latest" for row in rows]
+            await asyncio.to_thread(self.redis_client.delete, *cache_keys)
+        return len(rows)
     
     async def cleanup(self):
         """Cleanup database connections"""
+        if self._flush_task:
+            self._flush_task.cancel()
         if self.pg_pool:
+            try:
+                await self.flush_access()
+            except Exception as e:
+                print(f"Final access time flush failed: {e}", file=sys.stderr)
             await self.pg_pool.close()
         if self.redis_client:
             self.redis_client.close()
@@ -271,7 +489,8 @@ async def call_ai_with_context(ai_name: str, prompt: str, temperature: float = 0
                 full_prompt = prompt
             
             model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-pro-preview-06-05")
-            response = AI_CLIENTS["gemini"].models.generate_content(
+            response = await asyncio.to_thread(
+                AI_CLIENTS["gemini"].models.generate_content,
                 model=model_name,
                 contents=full_prompt,
                 config={"temperature": temperature}
@@ -295,7 +514,8 @@ async def call_ai_with_context(ai_name: str, prompt: str, temperature: float = 0
                 model = os.getenv("GROK_MODEL", "grok-3")
             else:
                 model = os.getenv("OPENAI_MODEL", "gpt-4o")
-            response = AI_CLIENTS[ai_name].chat.completions.create(
+            response = await asyncio.to_thread(
+                AI_CLIENTS[ai_name].chat.completions.create,
                 model=model,
                 messages=messages,
                 temperature=temperature
@@ -303,14 +523,73 @@ async def call_ai_with_context(ai_name: str, prompt: str, temperature: float = 0
             result = response.choices[0].message.content
         
         # Save to database
-        await db_manager.add_message(session_id, "user", prompt)
-        await db_manager.add_message(session_id, "assistant", result)
+        await db_manager.append_exchange(session_id, prompt, result)
         
         return result
         
     except Exception as e:
         return f"Error calling {ai_name}: {str(e)}"
 
+# Results of completed ask_* calls, kept so a client retry after a timeout
+# gets the stored answer instead of a second provider call and history write
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "600"))
+_inflight_calls: Dict[str, asyncio.Future] = {}
+
+# The stdio client of this process; its request ids restart with the process
+_CLIENT_ID = uuid.uuid4().hex
+
+def idempotency_key(params: Dict[str, Any], request_id: Any) -> Optional[str]:
+    """Client-supplied key, else this client's request id plus a hash of the whole params"""
+    meta = params.get("_meta") or {}
+    client_key = params.get("idempotency_key") or meta.get("idempotencyKey")
+    if client_key:
+        return f"{get_project_id()}:client:{client_key}"
+    if request_id is None:
+        return None
+    payload = json.dumps(
+        {k: v for k, v in params.items() if k not in ("_meta", "idempotency_key")},
+        sort_keys=True, default=str
+    )
+    return f"{get_project_id()}:request:{_CLIENT_ID}:{request_id}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+async def run_idempotent(key: Optional[str], call) -> str:
+    """Return the stored result for key, or run call once and store it"""
+    if key is None:
+        return await call()
+    if key in _inflight_calls:
+        # Retry while the first call is still running: wait for it
+        return await asyncio.shield(_inflight_calls[key])
+    
+    future = asyncio.get_running_loop().create_future()
+    _inflight_calls[key] = future
+    cache_key = f"idempotency:{key}"
+    try:
+        try:
+            stored = await asyncio.to_thread(db_manager.redis_client.get, cache_key)
+        except Exception:
+            stored = None
+        if stored is not None:
+            result = json.loads(stored)
+        else:
+            result = await call()
+            # Failures come back as "Error..." text; those may be retried
+            if not result.startswith("Error"):
+                try:
+                    await asyncio.to_thread(
+                        db_manager.redis_client.set, cache_key, json.dumps(result), ex=IDEMPOTENCY_TTL
+                    )
+                except Exception as e:
+                    print(f"Idempotency store failed: {e}", file=sys.stderr)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        if not future.done():
+            future.set_exception(e)
+            future.exception()
+        raise
+    finally:
+        _inflight_calls.pop(key, None)
+
 async def handle_request(request: Dict[str, Any]) -> Dict[str, Any]:
     """Handle MCP protocol request"""
     method = request.get("method")
@@ -401,7 +680,10 @@ async def handle_request(request: Dict[str, Any]) -> Dict[str, Any]:
             prompt = arguments.get("prompt")
             temperature = arguments.get("temperature", 0.7)
             
-            result = await call_ai_with_context(ai_name, prompt, temperature)
+            result = await run_idempotent(
+                idempotency_key(params, request_id),
+                lambda: call_ai_with_context(ai_name, prompt, temperature)
+            )
             
             return {
                 "jsonrpc": "2.0",
@@ -448,8 +730,7 @@ async def handle_request(request: Dict[str, Any]) -> Dict[str, Any]:
             
             try:
                 if ai_name == "all":
-                    for ai in AI_CLIENTS:
-                        await db_manager.clear_session(project_id, ai)
+                    await db_manager.clear_sessions([project_id], list(AI_CLIENTS))
                     text = "Cleared conversation history for all AIs (from PostgreSQL)"
                 else:
                     await db_manager.clear_session(project_id, ai_name)
@@ -478,21 +759,21 @@ async def handle_request(request: Dict[str, Any]) -> Dict[str, Any]:
             
             # Check PostgreSQL
             try:
-                async with db_manager.pg_pool.acquire() as conn:
+                async with db_manager.connection() as conn:
                     await conn.fetchval("SELECT 1")
                 status += "✓ PostgreSQL: Connected\n"
                 
-                # Get session count
-                async with db_manager.pg_pool.acquire() as conn:
-                    count = await conn.fetchval(
-                        "SELECT COUNT(*) FROM ai_sessions WHERE project_id = $1",
-                        get_project_id()
+                # Counters from ai_stats instead of counting the tables
+                async with db_manager.connection() as conn:
+                    rows = await conn.fetch(
+                        "SELECT project_id, sessions, messages FROM ai_stats WHERE project_id = ANY($1::text[])",
+                        [get_project_id(), '*']
                     )
+                    stats = {row['project_id']: row for row in rows}
+                    count = stats[get_project_id()]['sessions'] if get_project_id() in stats else 0
                     status += f"  Sessions for this project: {count}\n"
                     
-                    msg_count = await conn.fetchval(
-                        "SELECT COUNT(*) FROM ai_messages"
-                    )
+                    msg_count = stats['*']['messages'] if '*' in stats else 0
                     status += f"  Total messages: {msg_count}"
             except Exception as e:
                 status += f"✗ PostgreSQL: Error - {str(e)}"
@@ -525,56 +806,180 @@ async def handle_request(request: Dict[str, Any]) -> Dict[str, Any]:
             }
         }
 
-async def main_async():
-    """Async main loop"""
-    # Initialize database connections
-    await db_manager.initialize()
-    
-    print(f"MCP AI Collab Server v{__version__} starting...", file=sys.stderr)
-    print(f"Project ID: {get_project_id()}", file=sys.stderr)
-    print(f"Available AIs: {list(AI_CLIENTS.keys())}", file=sys.stderr)
-    
-    loop = asyncio.get_event_loop()
+# Concurrent stdio: every request runs as its own task and responses are
+# written, one whole line each, by a single writer as they complete
+STDIO_CONCURRENCY = int(os.getenv("MCP_STDIO_CONCURRENCY", "8"))
+STDIO_MAX_LINE = int(os.getenv("MCP_STDIO_MAX_LINE", str(64 * 1024 * 1024)))
+
+async def stdin_lines():
+    """
+    Yield stdin lines without blocking the event loop
+    Each byte is scanned once, so multi-megabyte lines stay linear; a line
+    longer than STDIO_MAX_LINE is discarded and yielded as None
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+    except (ValueError, OSError, NotImplementedError):
+        reader = None  # Not a pipe: read in a worker thread
     
+    buffer = bytearray()
+    scanned = 0
+    oversized = False
     while True:
-        try:
-            # Read line from stdin (in thread to not block)
-            line = await loop.run_in_executor(None, sys.stdin.readline)
-            if not line:
+        if reader is not None:
+            chunk = await reader.read(65536)
+        else:
+            chunk = await loop.run_in_executor(None, sys.stdin.buffer.read1, 65536)
+        if not chunk:
+            break
+        
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", scanned)
+            if end < 0:
                 break
-            
-            # Parse JSON request
+            line = bytes(buffer[start:end])
+            start = scanned = end + 1
+            if oversized:
+                oversized = False
+                yield None
+            elif line.strip():
+                yield line
+        
+        del buffer[:start]
+        scanned = len(buffer)
+        if scanned > STDIO_MAX_LINE:
+            oversized = True
+            buffer.clear()
+            scanned = 0
+    
+    if oversized:
+        yield None
+    elif buffer.strip():
+        yield bytes(buffer)
+
+def write_line(data: str):
+    sys.stdout.write(data)
+    sys.stdout.flush()
+
+async def handle_batch(handle, requests):
+    """
+    Run a JSON-RPC batch concurrently: one response per request with an id,
+    in request order, each with its own result or error
+    """
+    if not requests:
+        return {
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {"code": -32600, "message": "Invalid Request: empty batch"}
+        }
+    
+    slots = asyncio.Semaphore(STDIO_CONCURRENCY)
+    
+    async def run_item(request):
+        if not isinstance(request, dict):
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+        async with slots:
             try:
-                request = json.loads(line.strip())
-            except json.JSONDecodeError as e:
-                error = {
+                response = await handle(request)
+            except Exception as e:
+                response = {
                     "jsonrpc": "2.0",
+                    "id": request.get("id"),
                     "error": {
-                        "code": -32700,
-                        "message": f"Parse error: {str(e)}"
+                        "code": -32603,
+                        "message": f"Internal error: {str(e)}"
                     }
                 }
-                print(json.dumps(error), flush=True)
-                continue
-            
-            # Handle request
-            response = await handle_request(request)
-            
-            # Send response
-            print(json.dumps(response), flush=True)
-            
-        except KeyboardInterrupt:
-            break
+        # Notifications get no response
+        return response if "id" in request else None
+    
+    responses = await asyncio.gather(*(run_item(request) for request in requests))
+    return [response for response in responses if response is not None] or None
+
+async def serve_stdio(handle):
+    """
+    Serve JSON-RPC over stdio with at most STDIO_CONCURRENCY requests in
+    flight; a slow AI call no longer holds up requests behind it
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(STDIO_CONCURRENCY)
+    outbox = asyncio.Queue()
+    tasks = set()
+    
+    async def writer():
+        while True:
+            response = await outbox.get()
+            if response is None:
+                return
+            await loop.run_in_executor(None, write_line, json.dumps(response) + "\n")
+    
+    async def dispatch(request):
+        try:
+            if isinstance(request, list):
+                response = await handle_batch(handle, request)
+            else:
+                response = await handle(request)
         except Exception as e:
             print(f"Server error: {e}", file=sys.stderr)
-            error = {
+            response = {
                 "jsonrpc": "2.0",
+                "id": request.get("id") if isinstance(request, dict) else None,
                 "error": {
                     "code": -32603,
                     "message": f"Internal error: {str(e)}"
                 }
             }
-            print(json.dumps(error), flush=True)
+        finally:
+            slots.release()
+        if response is not None:
+            outbox.put_nowait(response)
+    
+    writer_task = asyncio.create_task(writer())
+    try:
+        async for line in stdin_lines():
+            # Parse JSON request
+            try:
+                if line is None:
+                    raise ValueError("request line too long")
+                request = json.loads(line)
+            except ValueError as e:
+                outbox.put_nowait({
+                    "jsonrpc": "2.0",
+                    "error": {
+                        "code": -32700,
+                        "message": f"Parse error: {str(e)}"
+                    }
+                })
+                continue
+            
+            await slots.acquire()
+            task = asyncio.create_task(dispatch(request))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        outbox.put_nowait(None)
+        await writer_task
+
+async def main_async():
+    """Async main loop"""
+    # Initialize database connections
+    await db_manager.initialize()
+    
+    print(f"MCP AI Collab Server v{__version__} starting...", file=sys.stderr)
+    print(f"Project ID: {get_project_id()}", file=sys.stderr)
+    print(f"Available AIs: {list(AI_CLIENTS.keys())}", file=sys.stderr)
+    
+    try:
+        await serve_stdio(handle_request)
+    except KeyboardInterrupt:
+        pass
     
     # Cleanup
     await db_manager.cleanup()
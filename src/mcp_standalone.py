@@ -13,6 +13,240 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime
 from pathlib import Path
 import hashlib
+import time
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+
+# Embedded SQLite store, same schema as core/sqlite_store.py. WAL mode lets
+# the server processes of several editor windows share one file: readers
+# never block, and one writer thread per process commits queued writes in
+# batches. CONTEXT_BACKEND=files keeps the JSON files instead
+CONTEXT_BACKEND = os.getenv("CONTEXT_BACKEND", "sqlite")
+
+# Durability, as in core/durability.py: none (no syncs), batched (writes of
+# all sessions committed every CONTEXT_GROUP_COMMIT_MS, one sync per batch)
+# or strict (every write synced on its own)
+CONTEXT_DURABILITY = (os.getenv("CONTEXT_DURABILITY") or "batched").lower()
+if CONTEXT_DURABILITY not in ("none", "batched", "strict"):
+    print(f"Unknown CONTEXT_DURABILITY {CONTEXT_DURABILITY!r}, using batched", file=sys.stderr)
+    CONTEXT_DURABILITY = "batched"
+CONTEXT_GROUP_COMMIT = float(os.getenv("CONTEXT_GROUP_COMMIT_MS", "2")) / 1000
+
+CONTEXT_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS contexts (
+        project_id TEXT NOT NULL, ai_name TEXT NOT NULL,
+        created_at TEXT NOT NULL, updated_at TEXT NOT NULL, summary TEXT,
+        PRIMARY KEY (project_id, ai_name)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY, project_id TEXT NOT NULL, ai_name TEXT NOT NULL,
+        role TEXT NOT NULL, content TEXT NOT NULL, ts TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS messages_project_ai_ts ON messages (project_id, ai_name, ts)",
+    "CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY, applied_at TEXT NOT NULL)",
+]
+
+CONTEXT_FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, content='messages', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+]
+
+class ContextDB:
+    """Context history per (project, AI) in one SQLite database"""
+
+    def __init__(self, path: Path, max_messages: int = 20):
+        self.path = str(path)
+        self.max_messages = max_messages
+        self._local = threading.local()
+        self._queue: queue.Queue = queue.Queue()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in CONTEXT_SCHEMA:
+            conn.execute(statement)
+        try:
+            for statement in CONTEXT_FTS_SCHEMA:
+                conn.execute(statement)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # No FTS5 in this SQLite build: search with LIKE
+            self.fts = False
+
+        self._writer_conn = conn
+        threading.Thread(target=self._writer, name="context-writer", daemon=True).start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA synchronous={'OFF' if CONTEXT_DURABILITY == 'none' else 'FULL'}")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def submit(self, write) -> Future:
+        """Queue write(conn); the future resolves once its batch is committed"""
+        future = Future()
+        self._queue.put((write, future))
+        return future
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + (CONTEXT_GROUP_COMMIT if CONTEXT_DURABILITY == "batched" else 0)
+            while CONTEXT_DURABILITY != "strict":
+                try:
+                    remaining = deadline - time.monotonic()
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            conn = self._writer_conn
+            done = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for write, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT write")
+                    try:
+                        result = write(conn)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write")
+                        conn.execute("RELEASE write")
+                        future.set_exception(e)
+                        continue
+                    conn.execute("RELEASE write")
+                    done.append((future, result))
+                conn.execute("COMMIT")
+            except Exception as e:
+                print(f"Context write failed: {e}", file=sys.stderr)
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                for write, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for future, result in done:
+                future.set_result(result)
+
+    def _insert(self, conn, project_id: str, ai_name: str, messages: List[Dict]):
+        now = datetime.now().isoformat()
+        conn.execute(
+            "INSERT INTO contexts VALUES (?, ?, ?, ?, NULL) "
+            "ON CONFLICT (project_id, ai_name) DO UPDATE SET updated_at = excluded.updated_at",
+            (project_id, ai_name, now, now)
+        )
+        conn.executemany(
+            "INSERT INTO messages (project_id, ai_name, role, content, ts) VALUES (?, ?, ?, ?, ?)",
+            [(project_id, ai_name, m["role"], m["content"], m.get("timestamp") or now) for m in messages]
+        )
+        # Keep the newest max_messages
+        conn.execute(
+            "DELETE FROM messages WHERE project_id = ? AND ai_name = ? AND id NOT IN ("
+            "SELECT id FROM messages WHERE project_id = ? AND ai_name = ? "
+            "ORDER BY ts DESC, id DESC LIMIT ?)",
+            (project_id, ai_name, project_id, ai_name, self.max_messages)
+        )
+
+    def _delete(self, conn, project_id: str, ai_name: str):
+        conn.execute("DELETE FROM messages WHERE project_id = ? AND ai_name = ?", (project_id, ai_name))
+        conn.execute("DELETE FROM contexts WHERE project_id = ? AND ai_name = ?", (project_id, ai_name))
+
+    def append(self, project_id: str, ai_name: str, messages: List[Dict]) -> Future:
+        return self.submit(lambda conn: self._insert(conn, project_id, ai_name, messages))
+
+    def replace(self, project_id: str, ai_name: str, messages: List[Dict]) -> Future:
+        def write(conn):
+            self._delete(conn, project_id, ai_name)
+            self._insert(conn, project_id, ai_name, messages)
+        return self.submit(write)
+
+    def clear(self, project_id: str, ai_name: str) -> Future:
+        return self.submit(lambda conn: self._delete(conn, project_id, ai_name))
+
+    def import_files(self, base_dir: Path) -> Future:
+        """One-time import of {project_id}/{ai_name}_context.json files"""
+        def write(conn):
+            name = f"json-files:{base_dir}"
+            if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+                return 0
+            imported = 0
+            for context_file in sorted(base_dir.glob("*/*_context.json")):
+                project_id = context_file.parent.name
+                ai_name = context_file.name[:-len("_context.json")]
+                if conn.execute(
+                    "SELECT 1 FROM contexts WHERE project_id = ? AND ai_name = ?", (project_id, ai_name)
+                ).fetchone():
+                    continue
+                try:
+                    with open(context_file, 'r') as f:
+                        messages = [
+                            m for m in json.load(f)
+                            if isinstance(m, dict) and "role" in m and "content" in m
+                        ]
+                except Exception:
+                    continue
+                self._insert(conn, project_id, ai_name, messages)
+                imported += 1
+            conn.execute("INSERT INTO migrations VALUES (?, datetime('now'))", (name,))
+            return imported
+        return self.submit(write)
+
+    def messages(self, project_id: str, ai_name: str) -> List[Dict]:
+        rows = self._reader().execute(
+            "SELECT role, content, ts FROM messages WHERE project_id = ? AND ai_name = ? "
+            "ORDER BY ts DESC, id DESC LIMIT ?",
+            (project_id, ai_name, self.max_messages)
+        ).fetchall()
+        return [{"role": r, "content": c, "timestamp": ts} for r, c, ts in reversed(rows)]
+
+    def search(self, text: str, project_id: str, ai_name: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        """Messages of the project containing every word of text, best matches first"""
+        words = text.split()
+        if not words:
+            return []
+        if self.fts:
+            sql = ("SELECT m.ai_name, m.role, m.content, m.ts FROM messages_fts f "
+                   "JOIN messages m ON m.id = f.rowid WHERE messages_fts MATCH ? AND m.project_id = ?")
+            args = [" ".join('"' + w.replace('"', '""') + '"' for w in words), project_id]
+            order = "ORDER BY f.rank"
+        else:
+            sql = "SELECT m.ai_name, m.role, m.content, m.ts FROM messages m WHERE m.project_id = ?"
+            args = [project_id]
+            for w in words:
+                sql += " AND m.content LIKE ? ESCAPE '\\'"
+                args.append("%" + w.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+            order = "ORDER BY m.ts DESC"
+        if ai_name:
+            sql += " AND m.ai_name = ?"
+            args.append(ai_name)
+        rows = self._reader().execute(f"{sql} {order} LIMIT ?", (*args, limit)).fetchall()
+        return [{"ai_name": a, "role": r, "content": c, "timestamp": ts} for a, r, c, ts in rows]
+
+def write_context_file(path: Path, context: List[Dict]):
+    """JSON fallback: replaced atomically unless durability is none, synced if strict"""
+    if CONTEXT_DURABILITY == "none":
+        with open(path, 'w') as f:
+            json.dump(context, f, indent=2)
+        return
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(temp_path, 'w') as f:
+        json.dump(context, f, indent=2)
+        if CONTEXT_DURABILITY == "strict":
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(temp_path, path)
 
 # Simple file-based storage for immediate functionality
 class SimpleContextStore:
@@ -22,6 +256,43 @@ class SimpleContextStore:
         self.base_dir = Path.home() / ".mcp-ai-collab" / "contexts"
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
+        # One lock per context file: concurrent requests for the same AI
+        # update it in turn, other AIs in parallel
+        self._locks: Dict[Path, List] = {}  # path -> [lock, users]
+        self.lock_waits = 0
+        self.lock_wait_ms = 0.0
+        
+        self.db: Optional[ContextDB] = None
+        if CONTEXT_BACKEND == "sqlite":
+            self.db = ContextDB(Path(os.getenv("CONTEXT_DB_PATH") or self.base_dir.parent / "contexts.db"))
+            try:
+                imported = self.db.import_files(self.base_dir).result()
+                if imported:
+                    print(f"Imported {imported} contexts into {self.db.path}", file=sys.stderr)
+            except Exception as e:
+                print(f"Context import failed: {e}", file=sys.stderr)
+        
+    @asynccontextmanager
+    async def _locked(self, context_file: Path):
+        entry = self._locks.setdefault(context_file, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            if entry[0].locked():
+                start = time.perf_counter()
+                await entry[0].acquire()
+                self.lock_waits += 1
+                self.lock_wait_ms += (time.perf_counter() - start) * 1000
+            else:
+                await entry[0].acquire()
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[context_file]
+        
     def _get_project_id(self, project_path: str) -> str:
         """Generate project ID from path"""
         return hashlib.md5(project_path.encode()).hexdigest()[:8]
@@ -33,6 +304,8 @@ class SimpleContextStore:
     
     async def get_context(self, ai_name: str, project_path: str) -> List[Dict]:
         """Get context for AI in project"""
+        if self.db:
+            return self.db.messages(self._get_project_id(project_path), ai_name)
         context_file = self._get_context_file(ai_name, project_path)
         if context_file.exists():
             try:
@@ -45,28 +318,52 @@ class SimpleContextStore:
     async def add_to_context(self, ai_name: str, project_path: str, 
                            role: str, content: str):
         """Add message to context"""
-        context_file = self._get_context_file(ai_name, project_path)
-        context_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        context = await self.get_context(ai_name, project_path)
-        context.append({
+        message = {
             "role": role,
             "content": content,
             "timestamp": datetime.now().isoformat()
-        })
+        }
+        if self.db:
+            await asyncio.wrap_future(
+                self.db.append(self._get_project_id(project_path), ai_name, [message])
+            )
+            return
         
-        # Keep last 20 messages
-        if len(context) > 20:
-            context = context[-20:]
+        context_file = self._get_context_file(ai_name, project_path)
+        context_file.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(context_file, 'w') as f:
-            json.dump(context, f, indent=2)
+        async with self._locked(context_file):
+            context = await self.get_context(ai_name, project_path)
+            context.append(message)
+            
+            # Keep last 20 messages
+            if len(context) > 20:
+                context = context[-20:]
+            
+            write_context_file(context_file, context)
     
     async def clear_context(self, ai_name: str, project_path: str):
         """Clear context for AI"""
+        if self.db:
+            await asyncio.wrap_future(self.db.clear(self._get_project_id(project_path), ai_name))
+            return
         context_file = self._get_context_file(ai_name, project_path)
-        if context_file.exists():
-            context_file.unlink()
+        async with self._locked(context_file):
+            if context_file.exists():
+                context_file.unlink()
+    
+    async def search_context(self, project_path: str, query: str, ai_name: Optional[str] = None) -> List[Dict]:
+        """Messages in this project containing every word of query"""
+        if self.db:
+            return self.db.search(query, self._get_project_id(project_path), ai_name)
+        
+        words = [w.lower() for w in query.split()]
+        results = []
+        for ai in [ai_name] if ai_name else ["gemini", "grok", "openai"]:
+            for msg in await self.get_context(ai, project_path):
+                if words and all(w in msg.get("content", "").lower() for w in words):
+                    results.append({"ai_name": ai, **msg})
+        return results[-10:]
 
 class MCPAICollab:
     """Standalone MCP server with context persistence"""
@@ -177,6 +474,18 @@ class MCPAICollab:
                                     },
                                     "required": ["ai"]
                                 }
+                            },
+                            {
+                                "name": "search_ai_context",
+                                "description": "Search stored conversations in this project",
+                                "inputSchema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "query": {"type": "string"},
+                                        "ai": {"type": "string", "enum": ["gemini", "grok", "openai"]}
+                                    },
+                                    "required": ["query"]
+                                }
                             }
                         ]
                     }
@@ -251,6 +560,27 @@ class MCPAICollab:
                             "content": [{"type": "text", "text": text}]
                         }
                     }
+                
+                elif tool_name == "search_ai_context":
+                    query = args.get("query", "")
+                    matches = await self.context_store.search_context(
+                        self.project_path, query, args.get("ai")
+                    )
+                    
+                    if not matches:
+                        text = f"No messages matching '{query}'"
+                    else:
+                        text = f"Messages matching '{query}':\n"
+                        for msg in matches:
+                            text += f"\n[{msg['ai_name']}] {msg['role']}: {msg['content'][:100]}..."
+                    
+                    return {
+                        "jsonrpc": "2.0",
+                        "id": request_id,
+                        "result": {
+                            "content": [{"type": "text", "text": text}]
+                        }
+                    }
             
             return {
                 "jsonrpc": "2.0",
@@ -354,30 +684,171 @@ class MCPAICollab:
     
     async def run(self):
         """Main stdio loop"""
+        try:
+            await serve_stdio(self.handle_request)
+        except KeyboardInterrupt:
+            pass
+
+# Concurrent stdio: every request runs as its own task and responses are
+# written, one whole line each, by a single writer as they complete
+STDIO_CONCURRENCY = int(os.getenv("MCP_STDIO_CONCURRENCY", "8"))
+STDIO_MAX_LINE = int(os.getenv("MCP_STDIO_MAX_LINE", str(64 * 1024 * 1024)))
+
+async def stdin_lines():
+    """
+    Yield stdin lines without blocking the event loop
+    Each byte is scanned once, so multi-megabyte lines stay linear; a line
+    longer than STDIO_MAX_LINE is discarded and yielded as None
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+    except (ValueError, OSError, NotImplementedError):
+        reader = None  # Not a pipe: read in a worker thread
+    
+    buffer = bytearray()
+    scanned = 0
+    oversized = False
+    while True:
+        if reader is not None:
+            chunk = await reader.read(65536)
+        else:
+            chunk = await loop.run_in_executor(None, sys.stdin.buffer.read1, 65536)
+        if not chunk:
+            break
+        
+        buffer += chunk
+        start = 0
         while True:
-            try:
-                line = sys.stdin.readline()
-                if not line:
-                    break
-                
-                request = json.loads(line.strip())
-                response = await self.handle_request(request)
-                
-                sys.stdout.write(json.dumps(response) + "\n")
-                sys.stdout.flush()
-                
-            except KeyboardInterrupt:
+            end = buffer.find(b"\n", scanned)
+            if end < 0:
                 break
+            line = bytes(buffer[start:end])
+            start = scanned = end + 1
+            if oversized:
+                oversized = False
+                yield None
+            elif line.strip():
+                yield line
+        
+        del buffer[:start]
+        scanned = len(buffer)
+        if scanned > STDIO_MAX_LINE:
+            oversized = True
+            buffer.clear()
+            scanned = 0
+    
+    if oversized:
+        yield None
+    elif buffer.strip():
+        yield bytes(buffer)
+
+def write_line(data: str):
+    sys.stdout.write(data)
+    sys.stdout.flush()
+
+async def handle_batch(handle, requests):
+    """
+    Run a JSON-RPC batch concurrently: one response per request with an id,
+    in request order, each with its own result or error
+    """
+    if not requests:
+        return {
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {"code": -32600, "message": "Invalid Request: empty batch"}
+        }
+    
+    slots = asyncio.Semaphore(STDIO_CONCURRENCY)
+    
+    async def run_item(request):
+        if not isinstance(request, dict):
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+        async with slots:
+            try:
+                response = await handle(request)
             except Exception as e:
-                error_response = {
+                response = {
+                    "jsonrpc": "2.0",
+                    "id": request.get("id"),
+                    "error": {
+                        "code": -32603,
+                        "message": f"Internal error: {str(e)}"
+                    }
+                }
+        # Notifications get no response
+        return response if "id" in request else None
+    
+    responses = await asyncio.gather(*(run_item(request) for request in requests))
+    return [response for response in responses if response is not None] or None
+
+async def serve_stdio(handle):
+    """
+    Serve JSON-RPC over stdio with at most STDIO_CONCURRENCY requests in
+    flight; a slow AI call no longer holds up requests behind it
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(STDIO_CONCURRENCY)
+    outbox = asyncio.Queue()
+    tasks = set()
+    
+    async def writer():
+        while True:
+            response = await outbox.get()
+            if response is None:
+                return
+            await loop.run_in_executor(None, write_line, json.dumps(response) + "\n")
+    
+    async def dispatch(request):
+        try:
+            if isinstance(request, list):
+                response = await handle_batch(handle, request)
+            else:
+                response = await handle(request)
+        except Exception as e:
+            print(f"Server error: {e}", file=sys.stderr)
+            response = {
+                "jsonrpc": "2.0",
+                "id": request.get("id") if isinstance(request, dict) else None,
+                "error": {
+                    "code": -32603,
+                    "message": f"Internal error: {str(e)}"
+                }
+            }
+        finally:
+            slots.release()
+        if response is not None:
+            outbox.put_nowait(response)
+    
+    writer_task = asyncio.create_task(writer())
+    try:
+        async for line in stdin_lines():
+            # Parse JSON request
+            try:
+                if line is None:
+                    raise ValueError("request line too long")
+                request = json.loads(line)
+            except ValueError as e:
+                outbox.put_nowait({
                     "jsonrpc": "2.0",
                     "error": {
                         "code": -32700,
                         "message": f"Parse error: {str(e)}"
                     }
-                }
-                sys.stdout.write(json.dumps(error_response) + "\n")
-                sys.stdout.flush()
+                })
+                continue
+            
+            await slots.acquire()
+            task = asyncio.create_task(dispatch(request))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        outbox.put_nowait(None)
+        await writer_task
 
 def main():
     if len(sys.argv) > 1 and sys.argv[1] == "--stdio":